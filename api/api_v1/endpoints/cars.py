@@ -1,61 +1,129 @@
-from typing import Any, List
+from typing import Any, Iterator, List, Literal, Optional
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from core.config import settings
 from core.request import RequestClient
+from core.serialization import RawJSONResponse, rows_to_json
+from core.streaming import csv_lines, ndjson_lines
+from crud.pagination import InvalidCursorError, InvalidOrderByError, cursor_for
+from crud.query import projection
 from api import crud, models, schemas
 from api import deps
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Campos do response_model da listagem, usados na serialização direta
+CAR_FIELDS = tuple(schemas.Car.model_fields)
+
 
 @router.get("/", response_model=List[schemas.Car])
 async def read_cars(
-        db: Session = Depends(deps.get_db),
+        response: Response,
+        db: deps.OffloadedSession = Depends(deps.get_offloaded_db_212),
         skip: int = 0,
         limit: int = 100,
+        after: Optional[str] = None,
+        fields: Optional[str] = Query(
+            None, description="Colunas a retornar, separadas por vírgula (ex.: id,model)"),
 ) -> Any:
     """
     Retrieve cars.
+
+    Com `after` a paginação é por cursor (keyset): passe o valor do header
+    `X-Next-Cursor` da página anterior para obter a seguinte.
+
+    Com `fields` só as colunas pedidas são lidas do banco e a resposta traz
+    apenas esses campos, sem passar pela validação do `response_model`; com
+    FAST_JSON_RESPONSE o mesmo vale para a lista completa, serializada direto
+    das linhas do banco.
     """
     logger.info("Consultando carros")
-    return crud.car.get_multi(db=db, skip=skip, limit=limit)
+    columns = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    if columns:
+        try:
+            projection(crud.car.model, columns)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    try:
+        if after is not None:
+            cars, next_cursor = await db.run(
+                crud.car.get_multi_keyset, after=after, limit=limit, fields=columns)
+        else:
+            cars = await db.run(crud.car.get_multi, skip=skip, limit=limit, fields=columns)
+            # Com `fields` o cursor só sai se o id estiver entre as colunas
+            has_id = not columns or "id" in columns
+            next_cursor = cursor_for(cars[-1], "id") if has_id and cars and len(cars) == limit else None
+    except (InvalidCursorError, InvalidOrderByError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    if settings.FAST_JSON_RESPONSE:
+        # Dados do próprio banco: dispensam a validação do response_model
+        return RawJSONResponse(rows_to_json(cars, CAR_FIELDS), headers=headers)
+    if columns:
+        # Mappings já vêm do banco: vão direto para JSON, sem o response_model
+        return JSONResponse(jsonable_encoder([dict(car) for car in cars]), headers=headers)
+    if headers:
+        response.headers.update(headers)
+    return cars
+
+
+@router.get("/export")
+async def export_cars(
+        export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+) -> StreamingResponse:
+    """
+    Export all cars as NDJSON or CSV, streamed with a server-side cursor.
+    """
+    logger.info("Exportando carros")
+
+    def rows() -> Iterator[Any]:
+        with deps.session_scope(deps.SessionLocal_212) as db:
+            yield from crud.car.stream_multi(db)
+
+    if export_format == "csv":
+        return StreamingResponse(
+            csv_lines(rows(), schemas.Car), media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="cars.csv"'})
+    return StreamingResponse(ndjson_lines(rows(), schemas.Car),
+                             media_type="application/x-ndjson")
 
 
 @router.post("/", response_model=schemas.Car)
 async def create_car(
         *,
-        db: Session = Depends(deps.get_db),
+        db: deps.OffloadedSession = Depends(deps.get_offloaded_db_212),
         car_in: schemas.CarCreate,
 ) -> Any:
     """
     Create new car.
     """
-    car = crud.car.create(db=db, obj_in=car_in)
+    car = await db.run(crud.car.create, obj_in=car_in)
     return car
 
 
 @router.delete(path="/{id}", response_model=schemas.Car)
 async def delete_car(
         *,
-        db: Session = Depends(deps.get_db),
+        db: deps.OffloadedSession = Depends(deps.get_offloaded_db_212),
         id: int,
 ) -> Any:
     """
     Delete an item.
     """
-    car = crud.car.get(db=db, id=id)
+    car = await db.run(crud.car.get, id=id)
     if not car:
         raise HTTPException(status_code=404, detail="Car not found")
-    car = crud.car.remove(db=db, id=id)
+    car = await db.run(crud.car.remove, id=id)
     return car
 
 
 @router.get(path="/request")
 async def request():
     client = RequestClient('GET', 'https://viacep.com.br/ws/03073010/json/',
-                           {'test': 'test'}, {'param1': 'teste'}, 30)
+                           {'test': 'test'}, {'param1': 'teste'}, 30, cache=True)
     response = await client.send_api_request()
     return response
@@ -1,10 +1,75 @@
 import logging
-from typing import AsyncGenerator, Generator
+from contextlib import contextmanager
+from typing import Any, AsyncGenerator, Callable, Generator, Iterator, TypeVar
 
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session, sessionmaker
+
+from core.config import settings
+from core.executor import BoundedExecutor, ExecutorBusyError
+from core.timing import timed
 from db.session import SessionLocal_212
 from db.session import SessionLocal_211
 from db.session import SessionLocal_psql
 
+T = TypeVar('T')
+
+db_executor = BoundedExecutor('db', max_workers=settings.DB_EXECUTOR_MAX_WORKERS,
+                              max_pending=settings.DB_EXECUTOR_MAX_PENDING)
+
+
+class OffloadedSession:
+    def __init__(self, session: Session, executor: BoundedExecutor) -> None:
+        """
+        Sessão síncrona cujas operações rodam no `db_executor`, fora do event loop.
+
+        Uso: `await db.run(crud.car.get_multi, skip=0, limit=100)`; a sessão é
+        passada como primeiro argumento da função.
+        """
+        self.session = session
+        self.executor = executor
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        try:
+            with timed('db'):
+                return await self.executor.run(fn, self.session, *args, **kwargs)
+        except ExecutorBusyError as exc:
+            logging.warning(str(exc))
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Banco de dados sobrecarregado, tente novamente")
+
+    async def close(self) -> None:
+        try:
+            with timed('db'):
+                await self.executor.run(lambda session: session.close(), self.session)
+        except ExecutorBusyError:
+            # Nunca deixa a conexão presa no pool por causa da fila cheia
+            self.session.close()
+
+
+def offloaded_session(session_local: sessionmaker) -> Callable[[], AsyncGenerator]:
+    async def get_db() -> AsyncGenerator:
+        db = OffloadedSession(session_local(), db_executor)
+        try:
+            yield db
+        finally:
+            await db.close()
+    return get_db
+
+
+@contextmanager
+def session_scope(session_local: sessionmaker) -> Iterator[Session]:
+    """
+    Sessão para geradores de `StreamingResponse`: as dependências com yield são
+    encerradas antes do corpo ser enviado, então o gerador precisa abrir a sua.
+    """
+    db = session_local()
+    try:
+        yield db
+    finally:
+        db.close()
+
 
 async def get_db_psql() -> AsyncGenerator:
     try:
@@ -28,3 +93,7 @@ def get_db_212() -> Generator:
         yield db
     finally:
         db.close()
+
+
+get_offloaded_db_211 = offloaded_session(SessionLocal_211)
+get_offloaded_db_212 = offloaded_session(SessionLocal_212)
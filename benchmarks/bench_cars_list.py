@@ -0,0 +1,72 @@
+"""
+Benchmark da serialização da listagem de carros (GET /cars/?limit=1000).
+
+Compara o caminho padrão do FastAPI (validação pelo response_model
+List[schemas.Car], conversão para JSON e json.dumps) com o caminho rápido de
+core.serialization (linhas do banco direto para bytes), para entidades ORM e
+para projeções com `fields=`. Antes de medir confere que o JSON é o mesmo.
+
+    python -m benchmarks.bench_cars_list
+"""
+import json
+import timeit
+from typing import List
+
+from pydantic import TypeAdapter
+
+import core.serialization as serialization
+from core.serialization import dumps, rows_to_json
+from models.car_model import Car
+from schemas.car_schema import Car as CarSchema
+
+LIMIT = 1000
+CAR_FIELDS = tuple(CarSchema.model_fields)
+adapter = TypeAdapter(List[CarSchema])
+
+
+def build_cars(count=LIMIT):
+    models = ['Gol', 'Onix', 'HB20', 'Corolla', 'Civic', 'Compass', 'Strada']
+    return [Car(id=i, model=f'{models[i % len(models)]} {i}', year=1990 + i % 35)
+            for i in range(1, count + 1)]
+
+
+def response_model_path(cars):
+    # O que o FastAPI 0.109 faz com `response_model` e JSONResponse
+    value = adapter.validate_python(cars, from_attributes=True)
+    content = adapter.dump_python(value, mode='json')
+    return json.dumps(content, ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(',', ':')).encode('utf-8')
+
+
+def fast_path(cars):
+    return rows_to_json(cars, CAR_FIELDS)
+
+
+def projection_path(rows):
+    return rows_to_json(rows)
+
+
+def bench(label, fn, arg, number=200):
+    elapsed = timeit.timeit(lambda: fn(arg), number=number)
+    per_call = elapsed / number
+    print(f'{label:<36} {per_call * 1000:8.3f} ms   {1 / per_call:8.0f} listas/s')
+    return per_call
+
+
+def main():
+    cars = build_cars()
+    rows = [{'id': car.id, 'model': car.model} for car in cars]
+    assert json.loads(response_model_path(cars)) == json.loads(fast_path(cars))
+    assert json.loads(projection_path(rows)) == [dict(row) for row in rows]
+    print(f'JSON idêntico ao do response_model ({LIMIT} carros). '
+          f'orjson: {"sim" if serialization.orjson is not None else "não (json da stdlib)"}\n')
+
+    baseline = bench('response_model + json.dumps', response_model_path, cars)
+    fast = bench('rows_to_json (entidades ORM)', fast_path, cars)
+    projected = bench('rows_to_json (fields=id,model)', projection_path, rows)
+    bench('dumps de dicts já prontos', dumps, rows)
+    print(f'\nGanho: {baseline / fast:.1f}x nas entidades, {baseline / projected:.1f}x com projeção')
+
+
+if __name__ == '__main__':
+    main()
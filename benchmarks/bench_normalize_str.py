@@ -0,0 +1,71 @@
+"""
+Micro-benchmark de core.filters.normalize_str contra a implementação anterior.
+
+Antes de medir, confere que a saída é idêntica para todos os caracteres do
+Unicode (exceto surrogates) e para amostras de strings aleatórias.
+
+    python -m benchmarks.bench_normalize_str
+"""
+import random
+import sys
+import timeit
+from unicodedata import normalize
+
+from core.filters import normalize_str
+
+LATIN1 = ('abcdefghijklmnopqrstuvwxyz ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+          'áàâãäéèêëíìîïóòôõöúùûüçñÁÀÂÃÄÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇÑªºß½')
+OTHERS = '̧́ŉǄŁő–—“”€ⅣＡ'
+
+
+def reference_normalize_str(string):
+    if string:
+        if not isinstance(string, str):
+            string = str(string, 'utf-8', 'replace')
+
+        string = string.encode('utf-8')
+        return normalize(
+            'NFKD', string.decode('utf-8')).encode('ASCII', 'ignore').decode()
+    return ''
+
+
+def check_equivalence(samples):
+    for code in range(sys.maxunicode + 1):
+        if 0xD800 <= code <= 0xDFFF:
+            continue
+        char = chr(code)
+        assert normalize_str(char) == reference_normalize_str(char), hex(code)
+    for value in samples:
+        assert normalize_str(value) == reference_normalize_str(value), value
+    for value in (None, '', b'S\xc3\xa3o Paulo', b'\xff\xfe'):
+        assert normalize_str(value) == reference_normalize_str(value), value
+
+
+def build_samples(alphabet, count=20000, seed=42):
+    rnd = random.Random(seed)
+    return [''.join(rnd.choice(alphabet) for _ in range(rnd.randint(65, 120)))
+            for _ in range(count)]
+
+
+def bench(label, values, number=5):
+    for name, fn in (('anterior', reference_normalize_str), ('atual', normalize_str)):
+        elapsed = timeit.timeit(lambda: [fn(v) for v in values], number=number)
+        print(f'{label:<32} {name:<9} {elapsed / number * 1000:8.2f} ms')
+
+
+def main():
+    latin1 = build_samples(LATIN1)
+    mixed = build_samples(LATIN1 + OTHERS)
+    check_equivalence(latin1 + mixed)
+    print('Saída idêntica à implementação anterior.\n')
+
+    ascii_values = ['Rua das Flores 123', 'ENTREGUE', 'Sao Paulo'] * 10000
+    cities = ['São Paulo', 'Florianópolis', 'Goiânia', 'Maceió', 'Jundiaí'] * 6000
+    bench('ASCII', ascii_values)
+    bench('valores repetidos (cidades)', cities)
+    bench('textos longos Latin-1', latin1)
+    bench('textos longos outros alfabetos', mixed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+
+class CacheBackend:
+    """
+    Interface dos backends de cache. Um backend compartilhado (ex.: Redis)
+    deve implementar estes métodos e cuidar da serialização dos valores.
+    """
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class LRUTTLCache(CacheBackend):
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None) -> None:
+        """
+        Cache em memória do processo, com descarte do item menos usado (LRU)
+        e expiração por item. Seguro para uso entre threads.
+
+        **Parameters**
+
+        * `maxsize`: Número máximo de itens
+        * `ttl`: Expiração padrão em segundos (None = sem expiração)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: 'OrderedDict[str, Tuple[Optional[float], Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -2,7 +2,7 @@ import logging
 import secrets
 from typing import Any, Dict, List, Optional, Union
 from fastapi.security.api_key import APIKeyHeader, APIKey
-from pydantic import AnyHttpUrl, AnyUrl, validator
+from pydantic import AnyHttpUrl, AnyUrl, BaseModel, validator
 from pydantic_settings import BaseSettings
 import firebase_admin
 from firebase_admin import credentials, storage
@@ -15,6 +15,26 @@ class IgnoredType:
     pass
 
 
+class PoolConfig(BaseModel):
+    """
+    Pool de conexões de uma engine (db.pool). Nas variáveis de ambiente vai
+    como JSON, ex.: DB_POOL_212='{"size": 20, "warmup": 5}'.
+    """
+    size: int = 5
+    max_overflow: int = 10
+    # Segundos até reciclar uma conexão (evita conexões derrubadas pelo servidor/firewall)
+    recycle: int = 1800
+    # Segundos esperando uma conexão livre antes de falhar
+    timeout: float = 30.0
+    # Testa a conexão a cada checkout (um round trip extra por uso)
+    pre_ping: bool = True
+    # Alternativa ao pre_ping: testa o banco a cada N segundos e, se falhar,
+    # descarta as conexões do pool (None = desativado)
+    health_check_interval: Optional[float] = None
+    # Conexões abertas na subida da aplicação (limitado a `size`)
+    warmup: int = 0
+
+
 class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     API_V2_STR: str = "/api/v2"
@@ -60,11 +80,21 @@ class Settings(BaseSettings):
                 "class": "logging.StreamHandler",
                 "stream": "ext://sys.stdout",
             },
+            # Enfileira os registros; formatação e escrita no stdout ficam
+            # numa thread separada (core.log.QueueListenerHandler)
+            "queue": {
+                "()": "core.log.QueueListenerHandler",
+                "handlers": ["cfg://handlers.default"],
+            },
         },
         "loggers": {
-            "": {"handlers": ["default"], "level": "INFO", "propagate": False},
+            "": {"handlers": ["queue"], "level": "INFO", "propagate": False},
         },
     }
+    # Tamanho máximo dos corpos de request/response nos logs (0 = sem limite)
+    LOG_BODY_MAX_CHARS: int = 2000
+    # Fração dos logs de chamadas externas bem-sucedidas que é emitida (1 = todos)
+    LOG_SUCCESS_SAMPLE_RATE: float = 1.0
 
     @validator("BACKEND_CORS_ORIGINS", pre=True)
     def assemble_cors_origins(cls, v: Union[str, List[str]]) -> Union[List[str], str]:
@@ -117,6 +147,95 @@ class Settings(BaseSettings):
             return v
         return f'mssql+pyodbc://{values.get("SQL_USER_211")}:{values.get("SQL_PASSWORD_211")}@{values.get("SQL_HOST_211")}/{values.get("SQL_DATABASE_211")}?driver=ODBC+Driver+17+for+SQL+Server'
 
+    '''Pools de conexão por engine (db.pool)'''
+    # Nas engines MSSQL, size + max_overflow deve cobrir DB_EXECUTOR_MAX_WORKERS
+    DB_POOL_PSQL: PoolConfig = PoolConfig()
+    DB_POOL_211: PoolConfig = PoolConfig()
+    DB_POOL_212: PoolConfig = PoolConfig()
+
+    '''Executor das sessões síncronas (MSSQL) usadas em endpoints async'''
+    DB_EXECUTOR_MAX_WORKERS: int = 10
+    # Máximo de tarefas aguardando thread livre (0 = ilimitado)
+    DB_EXECUTOR_MAX_PENDING: int = 100
+
+    '''Instrumentação das queries (db.instrumentation)'''
+    # Statements acima deste tempo são logados com o formato dos parâmetros
+    DB_SLOW_QUERY_SECONDS: float = 0.5
+    # Avisa quando uma request executa o mesmo statement este número de vezes (N+1); 0 desativa
+    DB_N_PLUS_ONE_THRESHOLD: int = 10
+
+    '''Operações em lote do CRUDBase'''
+    CRUD_BULK_CHUNK_SIZE: int = 1000
+    # Linhas buscadas por vez nas exportações (stream_multi/stream_filters)
+    CRUD_STREAM_CHUNK_SIZE: int = 1000
+    # Envia os executemany do pyodbc em um único round trip por lote
+    MSSQL_FAST_EXECUTEMANY: bool = True
+
+    '''Clientes HTTP compartilhados (core.http_clients), limites por host'''
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_DEFAULT_TIMEOUT: float = 100.0
+    # Requer o pacote h2 (pip install httpx[http2])
+    HTTP2_ENABLED: bool = False
+    # Sobrescreve os limites acima por host, ex.: {"viacep.com.br": {"max_connections": 10}}
+    HTTP_HOST_LIMITS: Dict[str, Dict[str, float]] = {}
+
+    '''Políticas das chamadas externas (core.resilience)'''
+    # Total de tentativas em métodos idempotentes (GET, HEAD, OPTIONS, PUT, DELETE)
+    HTTP_RETRY_ATTEMPTS: int = 3
+    HTTP_RETRY_BACKOFF_BASE: float = 0.2
+    HTTP_RETRY_BACKOFF_MAX: float = 5.0
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_READ_TIMEOUT: float = 30.0
+    HTTP_POOL_TIMEOUT: float = 5.0
+    HTTP_BREAKER_FAILURE_THRESHOLD: int = 5
+    HTTP_BREAKER_RESET_TIMEOUT: float = 30.0
+    # Segundos até disparar um GET duplicado (hedging); None desativa
+    HTTP_HEDGE_DELAY: Optional[float] = None
+    # Sobrescreve as políticas por host, com as chaves em minúsculas e sem o prefixo HTTP_,
+    # ex.: {"viacep.com.br": {"retry_attempts": 5, "read_timeout": 10, "hedge_delay": 0.5}}
+    HTTP_UPSTREAM_POLICIES: Dict[str, Dict[str, Any]] = {}
+
+    '''Cache de respostas de GETs externos (core.http_cache)'''
+    HTTP_CACHE_MAXSIZE: int = 1024
+    # Validade quando o upstream não envia Cache-Control
+    HTTP_CACHE_DEFAULT_TTL: float = 60.0
+    # Por quanto tempo manter respostas com ETag/Last-Modified para revalidação
+    HTTP_CACHE_STALE_TTL: float = 3600.0
+
+    '''Envio de requisições em lote (core.request.send_batch/iter_batch)'''
+    HTTP_BATCH_CONCURRENCY: int = 20
+    # Requisições por segundo por host; None = sem limite
+    HTTP_BATCH_RATE_PER_HOST: Optional[float] = None
+
+    '''Templates XML (core.xml_render)'''
+    # Recarrega templates alterados em disco; use só em desenvolvimento
+    TEMPLATES_AUTO_RELOAD: bool = False
+    # Diretório para o cache de bytecode do Jinja2 entre reinícios (None = desativado)
+    TEMPLATES_BYTECODE_CACHE_DIR: Optional[str] = None
+    TEMPLATES_PRECOMPILE: bool = True
+    # Renderização e parse de XML fora do event loop: None, 'thread' ou 'process'
+    XML_EXECUTOR: Optional[str] = None
+    XML_EXECUTOR_WORKERS: int = 2
+
+    '''Cache de leitura do CRUD (crud.cache)'''
+    # Models com cache em get/get_first_by_filter/get_multi_filter, ex.: ["Car"]
+    CRUD_CACHE_MODELS: List[str] = []
+    CRUD_CACHE_MAXSIZE: int = 1024
+    # Também é o atraso máximo para ver escritas feitas por outros processos
+    CRUD_CACHE_TTL: float = 60.0
+
+    '''Instrumentação das requests (core.timing)'''
+    # Envia o header Server-Timing (db, http, xml, total) nas respostas;
+    # desative se não quiser expor esses tempos para clientes externos
+    SERVER_TIMING_HEADER: bool = True
+
+    '''Serialização JSON (core.serialization)'''
+    # Usa orjson (se instalado) como resposta padrão e deixa as listas do CRUD
+    # irem direto de linhas para bytes, sem a validação do response_model
+    FAST_JSON_RESPONSE: bool = False
+
     class Config:
         case_sensitive = True
 
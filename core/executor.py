@@ -0,0 +1,136 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from core.metrics import Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+executor_pending = Gauge('executor_pending_tasks',
+                         'Tarefas aguardando uma thread livre no executor',
+                         ['executor'])
+executor_running = Gauge('executor_running_tasks',
+                         'Tarefas em execução no executor', ['executor'])
+executor_wait_seconds = Histogram('executor_wait_seconds',
+                                  'Tempo que cada tarefa esperou na fila do executor',
+                                  ['executor'])
+
+
+class ExecutorBusyError(RuntimeError):
+    """
+    Levantada quando a fila do executor atingiu `max_pending`.
+    """
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, max_workers: int, max_pending: int = 0, kind: str = 'thread') -> None:
+        """
+        Executor com número limitado de workers para tirar chamadas bloqueantes
+        (ex.: CRUD em sessões síncronas) ou pesadas em CPU do event loop.
+
+        **Parameters**
+
+        * `name`: Nome usado nas threads e nas métricas
+        * `max_workers`: Número máximo de workers
+        * `max_pending`: Tamanho máximo da fila de espera (0 = ilimitada)
+        * `kind`: 'thread' ou 'process'; no modo 'process' a função e os
+          argumentos precisam ser picklable, e o contexto (contextvars) e o
+          tempo de espera na fila não são propagados/medidos
+        """
+        if kind not in ('thread', 'process'):
+            raise ValueError(f'Tipo de executor inválido: {kind}')
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None and self.kind == 'process':
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers)
+                elif self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def _add_pending(self, amount: int) -> None:
+        with self._lock:
+            self._pending += amount
+        executor_pending.inc(amount, executor=self.name)
+
+    def _add_running(self, amount: int) -> None:
+        with self._lock:
+            self._running += amount
+        executor_running.inc(amount, executor=self.name)
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        queued = self._pending if self.kind == 'thread' else self._running - self.max_workers
+        if self.max_pending and queued >= self.max_pending:
+            raise ExecutorBusyError(
+                f'Fila do executor {self.name} cheia ({queued} tarefas)')
+
+        if self.kind == 'process':
+            return await self._run_in_process(fn, *args, **kwargs)
+
+        submitted = time.perf_counter()
+        # Propaga o contexto (trace do OpenTelemetry, etc.) para a thread
+        context = contextvars.copy_context()
+
+        def call() -> T:
+            executor_wait_seconds.observe(
+                time.perf_counter() - submitted, executor=self.name)
+            self._add_pending(-1)
+            self._add_running(1)
+            try:
+                return context.run(fn, *args, **kwargs)
+            finally:
+                self._add_running(-1)
+
+        self._add_pending(1)
+        future = self._get_executor().submit(call)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Se a tarefa nem chegou a começar, ela sai da fila aqui
+            if future.cancel():
+                self._add_pending(-1)
+            raise
+
+    async def _run_in_process(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        # Sem acesso ao início da execução no outro processo, a tarefa conta
+        # como "running" desde o envio até a conclusão
+        self._add_running(1)
+        future = self._get_executor().submit(fn, *args, **kwargs)
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            future.cancel()
+            self._add_running(-1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'kind': self.kind,
+            'max_workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'pending': self._pending,
+            'running': self._running,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            logger.info('Encerrando executor %s', self.name)
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -1,8 +1,57 @@
 from decimal import Decimal
 from datetime import date
 from datetime import datetime
+from functools import lru_cache
 from unicodedata import normalize
 
+# Strings até este tamanho passam pelo cache LRU (nomes de cidade, status...)
+_CACHE_MAX_LEN = 64
+
+
+def _strip_accents_slow(string):
+    return normalize('NFKD', string).encode('ASCII', 'ignore').decode()
+
+
+def _build_latin1_table():
+    """
+    Tabela de `bytes.translate` para Latin-1: cada byte vira o equivalente ASCII
+    do NFKD do caractere, ou é removido quando não há equivalente. Como todo
+    caractere ASCII é "starter" no Unicode, decompor caractere a caractere dá
+    exatamente o mesmo resultado do NFKD da string inteira.
+    """
+    table = bytearray(range(256))
+    delete = bytearray()
+    multi_char = bytearray()
+    for code in range(0x80, 0x100):
+        ascii_value = _strip_accents_slow(chr(code))
+        if len(ascii_value) == 1:
+            table[code] = ord(ascii_value)
+        elif not ascii_value:
+            delete.append(code)
+        else:
+            # ¼ ½ ¾ viram mais de um caractere e não cabem na tabela
+            multi_char.append(code)
+    return bytes(table), bytes(delete), bytes(multi_char)
+
+
+_LATIN1_TABLE, _LATIN1_DELETE, _LATIN1_MULTI_CHAR = _build_latin1_table()
+
+
+def _strip_accents(string):
+    try:
+        raw = string.encode('latin-1')
+    except UnicodeEncodeError:
+        # Latin Extended e demais alfabetos; o round trip em UTF-8 mantém o
+        # erro que a versão original levantava para surrogates
+        return _strip_accents_slow(string.encode('utf-8').decode('utf-8'))
+    for code in _LATIN1_MULTI_CHAR:
+        if code in raw:
+            return _strip_accents_slow(string)
+    return raw.translate(_LATIN1_TABLE, _LATIN1_DELETE).decode('ascii')
+
+
+_strip_accents_cached = lru_cache(maxsize=4096)(_strip_accents)
+
 
 def normalize_str(string):
     """
@@ -12,9 +61,11 @@ def normalize_str(string):
         if not isinstance(string, str):
             string = str(string, 'utf-8', 'replace')
 
-        string = string.encode('utf-8')
-        return normalize(
-            'NFKD', string.decode('utf-8')).encode('ASCII', 'ignore').decode()
+        if string.isascii():
+            return string
+        if len(string) <= _CACHE_MAX_LEN:
+            return _strip_accents_cached(string)
+        return _strip_accents(string)
     return ''
 
 
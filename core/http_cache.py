@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from core.cache import CacheBackend, LRUTTLCache
+from core.config import settings
+from core.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+cache_requests_total = Counter('http_client_cache_requests_total',
+                               'Consultas ao cache de respostas externas',
+                               ['result'])
+
+
+@dataclass
+class CachedResponse:
+    # Corpo JSON cru: cada leitura decodifica um objeto novo, então quem
+    # altera o resultado não afeta o cache nem as outras requisições
+    body: bytes
+    fresh_until: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.fresh_until
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+def _cache_control(response: httpx.Response) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in response.headers.get('cache-control', '').split(','):
+        name, _, value = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def _freshness(response: httpx.Response, default_ttl: float) -> Optional[float]:
+    """
+    Segundos em que a resposta pode ser servida sem revalidar, ou None se não
+    puder ser guardada.
+    """
+    if response.headers.get('vary', '').strip() == '*':
+        return None
+    directives = _cache_control(response)
+    if 'no-store' in directives:
+        return None
+    if 'no-cache' in directives:
+        return 0
+    if directives.get('max-age') is not None:
+        try:
+            return max(0, int(directives['max-age']))
+        except ValueError:
+            return 0
+    return default_ttl
+
+
+class ResponseCache:
+    def __init__(self, backend: Optional[CacheBackend] = None) -> None:
+        """
+        Cache das respostas de GETs externos, respeitando Cache-Control e
+        revalidando com ETag/Last-Modified quando a entrada expira.
+
+        Requisições idênticas concorrentes que não acham a resposta no cache
+        compartilham uma única chamada ao upstream.
+
+        `backend` pode ser trocado por um cache compartilhado entre processos.
+        """
+        self.backend = backend or LRUTTLCache(maxsize=settings.HTTP_CACHE_MAXSIZE)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def key(method: str, url: str, params: Optional[dict]) -> str:
+        return f'http:{method.upper()} {url}?{json.dumps(params or {}, sort_keys=True, default=str)}'
+
+    async def fetch(self, key: str,
+                    send: Callable[[Dict[str, str]], Awaitable[httpx.Response]],
+                    ttl: Optional[float] = None) -> Any:
+        """
+        Retorna o JSON da resposta, do cache ou de `send(headers_extras)`.
+        Cada chamada recebe um objeto próprio.
+        """
+        entry: Optional[CachedResponse] = self.backend.get(key)
+        if entry is not None and entry.is_fresh:
+            cache_requests_total.inc(result='hit')
+            return json.loads(entry.body)
+
+        task = self._inflight.get(key)
+        if task is not None:
+            cache_requests_total.inc(result='coalesced')
+            return json.loads(await asyncio.shield(task))
+
+        task = asyncio.ensure_future(self._load(key, entry, send, ttl))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._done(key, t))
+        return json.loads(await asyncio.shield(task))
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            # Marca a exceção como consumida mesmo se ninguém mais aguardar
+            task.exception()
+
+    async def _load(self, key: str, entry: Optional[CachedResponse],
+                    send: Callable[[Dict[str, str]], Awaitable[httpx.Response]],
+                    ttl: Optional[float]) -> bytes:
+        default_ttl = settings.HTTP_CACHE_DEFAULT_TTL if ttl is None else ttl
+        response = await send(entry.validators() if entry is not None else {})
+
+        if response.status_code == 304 and entry is not None:
+            cache_requests_total.inc(result='revalidated')
+            freshness = _freshness(response, default_ttl)
+            entry.fresh_until = time.time() + (freshness or 0)
+            self._store(key, entry)
+            return entry.body
+
+        cache_requests_total.inc(result='miss')
+        body = response.content
+        freshness = _freshness(response, default_ttl)
+        if freshness is None:
+            self.backend.delete(key)
+            return body
+        self._store(key, CachedResponse(
+            body=body,
+            fresh_until=time.time() + freshness,
+            etag=response.headers.get('etag'),
+            last_modified=response.headers.get('last-modified'),
+        ))
+        return body
+
+    def _store(self, key: str, entry: CachedResponse) -> None:
+        fresh_for = max(0.0, entry.fresh_until - time.time())
+        if entry.etag or entry.last_modified:
+            # Guarda além da validade para poder revalidar com 304
+            self.backend.set(key, entry, ttl=max(fresh_for, settings.HTTP_CACHE_STALE_TTL))
+        elif fresh_for > 0:
+            self.backend.set(key, entry, ttl=fresh_for)
+
+
+response_cache = ResponseCache()
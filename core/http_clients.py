@@ -0,0 +1,84 @@
+import logging
+from typing import Dict, Optional
+
+import httpx
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HTTPClientRegistry:
+    def __init__(self) -> None:
+        """
+        Um `httpx.AsyncClient` por host (esquema + host + porta), criado sob demanda
+        e reaproveitado durante toda a vida da aplicação, mantendo as conexões
+        TCP/TLS vivas entre requisições.
+
+        Só entrega clientes entre `start()` e `aclose()` (lifespan do FastAPI);
+        fora disso `get()` retorna None e o chamador usa um cliente avulso.
+        """
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._started = False
+        self._http2: Optional[bool] = None
+
+    @staticmethod
+    def host_key(url: str) -> str:
+        parsed = httpx.URL(url)
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        return f'{parsed.scheme}://{parsed.host}:{port}'
+
+    def _use_http2(self) -> bool:
+        if self._http2 is None:
+            self._http2 = settings.HTTP2_ENABLED and _http2_available()
+            if settings.HTTP2_ENABLED and not self._http2:
+                logger.warning(
+                    'HTTP2_ENABLED ativo, mas o pacote h2 não está instalado; usando HTTP/1.1')
+        return self._http2
+
+    def _limits(self, host: str) -> httpx.Limits:
+        overrides = settings.HTTP_HOST_LIMITS.get(host, {})
+        return httpx.Limits(
+            max_connections=overrides.get(
+                'max_connections', settings.HTTP_MAX_CONNECTIONS),
+            max_keepalive_connections=overrides.get(
+                'max_keepalive_connections', settings.HTTP_MAX_KEEPALIVE_CONNECTIONS),
+            keepalive_expiry=overrides.get(
+                'keepalive_expiry', settings.HTTP_KEEPALIVE_EXPIRY),
+        )
+
+    def start(self) -> None:
+        self._started = True
+
+    def get(self, url: str) -> Optional[httpx.AsyncClient]:
+        if not self._started:
+            return None
+        key = self.host_key(url)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            host = httpx.URL(url).host
+            logger.info('Criando cliente HTTP compartilhado para %s', key)
+            client = self._clients[key] = httpx.AsyncClient(
+                limits=self._limits(host),
+                http2=self._use_http2(),
+                timeout=settings.HTTP_DEFAULT_TIMEOUT,
+            )
+        return client
+
+    async def aclose(self) -> None:
+        self._started = False
+        clients, self._clients = self._clients, {}
+        for key, client in clients.items():
+            logger.info('Encerrando cliente HTTP compartilhado de %s', key)
+            await client.aclose()
+
+
+http_clients = HTTPClientRegistry()
@@ -0,0 +1,81 @@
+import atexit
+import logging
+import random
+from logging.config import ConvertingList
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Any, Callable, List, Optional, Union
+
+from core.config import settings
+
+
+def _resolve_handlers(handlers: Union[List[logging.Handler], ConvertingList]) -> List[logging.Handler]:
+    # O dictConfig só resolve as referências 'cfg://' ao acessar por índice
+    return [handlers[i] for i in range(len(handlers))]
+
+
+class QueueListenerHandler(QueueHandler):
+    def __init__(self, handlers: List[logging.Handler], respect_handler_level: bool = True) -> None:
+        """
+        Handler que só enfileira o registro de log; uma thread (QueueListener)
+        formata e escreve nos `handlers` de destino, fora do caminho da request.
+
+        Uso no LOGGING_CONFIG:
+
+            "queue": {
+                "()": "core.log.QueueListenerHandler",
+                "handlers": ["cfg://handlers.default"],
+            }
+        """
+        super().__init__(SimpleQueue())
+        self.listener = QueueListener(
+            self.queue, *_resolve_handlers(handlers), respect_handler_level=respect_handler_level)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # O QueueHandler padrão formata a mensagem aqui (na thread da request).
+        # A fila é do próprio processo, então o registro segue como está e a
+        # interpolação dos args fica para a thread do listener; por isso não
+        # passe para o log objetos que serão alterados logo em seguida.
+        return record
+
+    def stop(self) -> None:
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+
+class Truncated:
+    __slots__ = ('value', 'max_chars')
+
+    def __init__(self, value: Any, max_chars: Optional[int] = None) -> None:
+        self.value = value
+        self.max_chars = settings.LOG_BODY_MAX_CHARS if max_chars is None else max_chars
+
+    def __str__(self) -> str:
+        value = self.value() if callable(self.value) else self.value
+        text = value if isinstance(value, str) else str(value)
+        if self.max_chars and len(text) > self.max_chars:
+            return f'{text[:self.max_chars]}... ({len(text)} caracteres)'
+        return text
+
+    __repr__ = __str__
+
+
+def truncate(value: Union[Any, Callable[[], Any]], max_chars: Optional[int] = None) -> Truncated:
+    """
+    Envolve um valor para o log, truncado em `max_chars` (padrão
+    LOG_BODY_MAX_CHARS; 0 = sem limite). A conversão para texto só acontece
+    se o registro for de fato formatado; passe um callable (ex.:
+    `lambda: res.text`) para adiar também a obtenção do valor.
+    """
+    return Truncated(value, max_chars)
+
+
+def sampled(rate: Optional[float] = None) -> bool:
+    """
+    Sorteia se um log de alto volume deve ser emitido, com probabilidade
+    `rate` (padrão LOG_SUCCESS_SAMPLE_RATE).
+    """
+    rate = settings.LOG_SUCCESS_SAMPLE_RATE if rate is None else rate
+    return rate >= 1 or random.random() < rate
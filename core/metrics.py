@@ -0,0 +1,249 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE_LATEST = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return 'NaN'
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in zip(names, values))
+    return '{%s}' % pairs
+
+
+class Registry:
+    """
+    Registro simples de métricas no formato texto do Prometheus.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, '_Metric'] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: '_Metric') -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Métrica já registrada: {metric.name}')
+            self._metrics[metric.name] = metric
+
+    def render(self) -> bytes:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type_}')
+            lines.extend(metric.collect())
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    type_ = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[Registry] = REGISTRY) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f'Labels inválidas para {self.name}: {sorted(labels)} != {sorted(self.labelnames)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def collect(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_ = 'counter'
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in items]
+
+
+class Gauge(_Metric):
+    type_ = 'gauge'
+
+    def __init__(self, *args, callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None,
+                 **kwargs) -> None:
+        """
+        `callback`, quando informado, é chamado a cada coleta e deve retornar
+        um dicionário {valores_das_labels: valor}, útil para estados lidos sob demanda.
+        """
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self._callback is not None:
+            values.update(self._callback())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    type_ = 'histogram'
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        buckets = sorted(buckets)
+        if buckets[-1] != math.inf:
+            buckets.append(math.inf)
+        self.buckets = tuple(buckets)
+        # valores_das_labels -> [contagem por bucket..., soma, total]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+                    break
+            data[-2] += value
+            data[-1] += 1
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(data)) for key, data in self._values.items()]
+        names = self.labelnames + ('le',)
+        lines = []
+        for key, data in items:
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += data[i]
+                lines.append(
+                    f'{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(data[-2])}')
+            lines.append(f'{self.name}_count{labels} {data[-1]}')
+        return lines
+
+
+class Summary(_Metric):
+    type_ = 'summary'
+
+    def __init__(self, *args, quantiles: Sequence[float] = DEFAULT_QUANTILES,
+                 max_age: float = 600, max_samples: int = 1024, **kwargs) -> None:
+        """
+        Quantis calculados no processo sobre uma janela deslizante: as últimas
+        `max_samples` observações dos últimos `max_age` segundos. `_sum` e
+        `_count` são acumulados desde o início, como no Prometheus.
+        """
+        super().__init__(*args, **kwargs)
+        self.quantiles = tuple(sorted(quantiles))
+        self.max_age = max_age
+        self.max_samples = max_samples
+        # valores_das_labels -> (janela de (instante, valor), [soma, total])
+        self._values: Dict[Tuple[str, ...], Tuple[deque, List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = (deque(maxlen=self.max_samples), [0, 0])
+            data[0].append((time.monotonic(), value))
+            data[1][0] += value
+            data[1][1] += 1
+
+    def _window(self, key: Tuple[str, ...]) -> List[float]:
+        window = self._values[key][0]
+        cutoff = time.monotonic() - self.max_age
+        while window and window[0][0] < cutoff:
+            window.popleft()
+        return sorted(value for _, value in window)
+
+    def quantile(self, q: float, **labels: str) -> float:
+        with self._lock:
+            key = self._key(labels)
+            values = self._window(key) if key in self._values else []
+        return _quantile(values, q)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = [(key, self._window(key), list(self._values[key][1])) for key in self._values]
+        names = self.labelnames + ('quantile',)
+        lines = []
+        for key, values, (total, count) in items:
+            for q in self.quantiles:
+                lines.append(
+                    f'{self.name}{_format_labels(names, key + (repr(q),))} {_format_value(_quantile(values, q))}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+def _quantile(values: List[float], q: float) -> float:
+    # Nearest-rank sobre uma lista já ordenada
+    if not values:
+        return math.nan
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+def render_latest() -> bytes:
+    return REGISTRY.render()
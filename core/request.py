@@ -1,40 +1,180 @@
+import asyncio
 import logging
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
 import httpx
 from opentelemetry.propagate import inject
+from core.config import settings
+from core.http_cache import response_cache
+from core.http_clients import http_clients
+from core.log import sampled, truncate
+from core.resilience import execute, policy_for
+from core.timing import timed
 
 logger = logging.getLogger()
 
 
 async def log_request_result(prefix, endpoint, method, request_data, res):
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    # Erros são sempre registrados; sucessos seguem LOG_SUCCESS_SAMPLE_RATE
+    if prefix == 'request_success' and not sampled():
+        return
     logger.info(
-        f"{prefix} | request_method: {method} | request_url: {endpoint!r} | request_body: {request_data} | response_code: {res.status_code} | response_body {res.text}"
+        "%s | request_method: %s | request_url: %r | request_body: %s | response_code: %s | response_body %s",
+        prefix, method, endpoint, truncate(request_data), res.status_code, truncate(lambda: res.text),
+        extra={'event': prefix, 'http_method': method, 'http_url': endpoint,
+               'http_status_code': res.status_code},
     )
 
 
 class RequestClient:
-    def __init__(self, method, url: str, headers, request_data: dict = None, timeout: int = 100) -> None:
+    def __init__(self, method, url: str, headers, request_data: dict = None, timeout: float = None,
+                 cache: bool = False, cache_ttl: float = None) -> None:
+        """
+        `timeout` é o timeout de leitura da chamada; se omitido vale o
+        `read_timeout` da política do host (core.resilience).
+
+        Com `cache=True` respostas de GET ficam no `response_cache` pela validade
+        do Cache-Control ou, sem ele, por `cache_ttl` (padrão HTTP_CACHE_DEFAULT_TTL).
+        A chave não inclui os headers: não use para respostas que dependem do usuário.
+        """
         self.method = method
         self.url = url
         self.request_data = request_data
         self.headers = headers
         self.timeout = timeout
+        self.cache = cache
+        self.cache_ttl = cache_ttl
         inject(carrier=self.headers)
 
     async def send_api_request(self):
-        logger.info(f"Sending a {self.method} request to: {self.url}")
-        logger.info(f"Request body/params: {self.request_data}")
-        logger.info(f"Request HEADERS: {self.headers}")
+        logger.info("Sending a %s request to: %s", self.method, self.url)
+        logger.debug("Request body/params: %s", truncate(self.request_data))
+        logger.debug("Request HEADERS: %s", self.headers)
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                request = httpx.Request(self.method.upper(), url=self.url,
-                                        **{f"{'params' if self.method == 'get' else 'json'}": self.request_data},
-                                        headers=self.headers)
-                response = await client.send(request)
+        if self.cache and self.method.upper() == 'GET':
+            key = response_cache.key(self.method, self.url, self.request_data)
+            return await response_cache.fetch(key, self._request, ttl=self.cache_ttl)
+
+        response = await self._request()
+        return response.json()
+
+    async def _request(self, extra_headers: dict = None) -> httpx.Response:
+        client = http_clients.get(self.url)
+        with timed('http'):
+            if client is None:
+                # Fora do lifespan da aplicação (scripts, testes): cliente avulso
+                async with httpx.AsyncClient() as client:
+                    return await self._send(client, extra_headers)
+            return await self._send(client, extra_headers)
+
+    async def _send(self, client: httpx.AsyncClient, extra_headers: dict = None) -> httpx.Response:
+        host = httpx.URL(self.url).host
+        timeout = policy_for(host).timeout(self.timeout)
+        headers = {**self.headers, **extra_headers} if extra_headers else self.headers
+
+        def send_once():
+            request = client.build_request(self.method.upper(), url=self.url,
+                                           **{f"{'params' if self.method == 'get' else 'json'}": self.request_data},
+                                           headers=headers, timeout=timeout)
+            return client.send(request)
+
+        try:
+            response = await execute(host, self.method, send_once)
+            # 304 em resposta aos validadores do cache é tratado pelo ResponseCache
+            if not (response.status_code == 304 and extra_headers):
                 response.raise_for_status()
-            except httpx.HTTPStatusError as exc:
-                await log_request_result('request_error', self.url, self.method, self.request_data, response)
-                raise exc
+        except httpx.HTTPStatusError as exc:
+            await log_request_result('request_error', self.url, self.method, self.request_data, response)
+            raise exc
+
+        await log_request_result('request_success', self.url, self.method, self.request_data, response)
+        return response
+
+
+@dataclass
+class BatchResult:
+    index: int
+    client: RequestClient
+    data: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class HostRateLimiter:
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        """
+        Token bucket por host: no máximo `rate` requisições por segundo, com
+        rajadas de até `burst`.
+        """
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, List[float]] = {}
+
+    async def acquire(self, host: str) -> None:
+        bucket = self._buckets.setdefault(host, [float(self.burst), time.monotonic()])
+        while True:
+            now = time.monotonic()
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return
+            await asyncio.sleep((1 - bucket[0]) / self.rate)
+
+
+def _batch_tasks(clients: Iterable[RequestClient], concurrency: Optional[int],
+                 rate_per_host: Optional[float]) -> List[asyncio.Task]:
+    semaphore = asyncio.Semaphore(concurrency or settings.HTTP_BATCH_CONCURRENCY)
+    rate_per_host = rate_per_host if rate_per_host is not None else settings.HTTP_BATCH_RATE_PER_HOST
+    limiter = HostRateLimiter(rate_per_host) if rate_per_host else None
+
+    async def run(index: int, client: RequestClient) -> BatchResult:
+        async with semaphore:
+            try:
+                if limiter is not None:
+                    await limiter.acquire(httpx.URL(client.url).host)
+                return BatchResult(index, client, data=await client.send_api_request())
+            except Exception as exc:
+                logger.warning("Batch item %s (%s %s) failed: %r", index, client.method, client.url, exc)
+                return BatchResult(index, client, error=exc)
+
+    return [asyncio.ensure_future(run(index, client)) for index, client in enumerate(clients)]
+
+
+async def send_batch(clients: Iterable[RequestClient], *, concurrency: int = None,
+                     rate_per_host: float = None) -> List[BatchResult]:
+    """
+    Envia várias requisições em paralelo (no máximo `concurrency` ao mesmo tempo,
+    padrão HTTP_BATCH_CONCURRENCY, e `rate_per_host` req/s por host, padrão
+    HTTP_BATCH_RATE_PER_HOST) e retorna os resultados na ordem de `clients`.
+
+    A falha de um item não afeta os demais: ela vem em `BatchResult.error`.
+    """
+    tasks = _batch_tasks(clients, concurrency, rate_per_host)
+    try:
+        return list(await asyncio.gather(*tasks))
+    finally:
+        for task in tasks:
+            task.cancel()
+
 
-            await log_request_result('request_success', self.url, self.method, self.request_data, response)
-            return response.json()
+async def iter_batch(clients: Iterable[RequestClient], *, concurrency: int = None,
+                     rate_per_host: float = None) -> AsyncIterator[BatchResult]:
+    """
+    Igual a `send_batch`, mas entrega cada resultado assim que ele termina;
+    use `BatchResult.index` para saber a posição original.
+    """
+    tasks = _batch_tasks(clients, concurrency, rate_per_host)
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        # Se o consumidor parar antes do fim, não deixa requisições órfãs
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, fields
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from core.config import settings
+from core.metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+retries_total = Counter('http_client_retries_total',
+                        'Novas tentativas de chamadas externas', ['host', 'reason'])
+hedged_total = Counter('http_client_hedged_requests_total',
+                       'Requisições GET duplicadas por hedging', ['host'])
+circuit_rejections_total = Counter('http_client_circuit_rejections_total',
+                                   'Chamadas recusadas com o circuito aberto', ['host'])
+circuit_state = Gauge('http_client_circuit_state',
+                      'Estado do circuit breaker (0=fechado, 1=meio-aberto, 2=aberto)', ['host'])
+
+
+class CircuitOpenError(httpx.RequestError):
+    """
+    O upstream está marcado como indisponível; a chamada nem foi feita.
+    """
+
+
+@dataclass(frozen=True)
+class UpstreamPolicy:
+    retry_attempts: int
+    backoff_base: float
+    backoff_max: float
+    connect_timeout: float
+    read_timeout: float
+    pool_timeout: float
+    breaker_failure_threshold: int
+    breaker_reset_timeout: float
+    hedge_delay: Optional[float]
+    retry_statuses: Tuple[int, ...] = (502, 503, 504)
+
+    def timeout(self, read_timeout: Optional[float] = None) -> httpx.Timeout:
+        read = read_timeout if read_timeout is not None else self.read_timeout
+        return httpx.Timeout(connect=self.connect_timeout, read=read,
+                             write=read, pool=self.pool_timeout)
+
+    def backoff(self, attempt: int) -> float:
+        # Backoff exponencial com "full jitter"
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+
+_policies: Dict[str, UpstreamPolicy] = {}
+
+
+def policy_for(host: str) -> UpstreamPolicy:
+    """
+    Política do host: os defaults `HTTP_*` do Settings sobrescritos pelo que
+    estiver em `HTTP_UPSTREAM_POLICIES[host]`.
+    """
+    policy = _policies.get(host)
+    if policy is None:
+        values = {
+            'retry_attempts': settings.HTTP_RETRY_ATTEMPTS,
+            'backoff_base': settings.HTTP_RETRY_BACKOFF_BASE,
+            'backoff_max': settings.HTTP_RETRY_BACKOFF_MAX,
+            'connect_timeout': settings.HTTP_CONNECT_TIMEOUT,
+            'read_timeout': settings.HTTP_READ_TIMEOUT,
+            'pool_timeout': settings.HTTP_POOL_TIMEOUT,
+            'breaker_failure_threshold': settings.HTTP_BREAKER_FAILURE_THRESHOLD,
+            'breaker_reset_timeout': settings.HTTP_BREAKER_RESET_TIMEOUT,
+            'hedge_delay': settings.HTTP_HEDGE_DELAY,
+        }
+        overrides = settings.HTTP_UPSTREAM_POLICIES.get(host, {})
+        known = {field.name for field in fields(UpstreamPolicy)}
+        unknown = set(overrides) - known
+        if unknown:
+            raise ValueError(
+                f'Chaves desconhecidas em HTTP_UPSTREAM_POLICIES[{host!r}]: {sorted(unknown)}')
+        values.update(overrides)
+        if 'retry_statuses' in values:
+            values['retry_statuses'] = tuple(values['retry_statuses'])
+        policy = _policies[host] = UpstreamPolicy(**values)
+    return policy
+
+
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, host: str, failure_threshold: int, reset_timeout: float) -> None:
+        """
+        Abre após `failure_threshold` falhas seguidas; depois de `reset_timeout`
+        segundos deixa passar uma chamada de teste (meio-aberto), que fecha o
+        circuito se der certo ou o reabre se falhar.
+        """
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._set_state(self.CLOSED)
+
+    def _set_state(self, state: int) -> None:
+        self.state = state
+        circuit_state.set(state, host=self.host)
+
+    def before_call(self) -> None:
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                circuit_rejections_total.inc(host=self.host)
+                raise CircuitOpenError(f'Circuito aberto para {self.host}')
+            self._set_state(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                circuit_rejections_total.inc(host=self.host)
+                raise CircuitOpenError(
+                    f'Circuito meio-aberto para {self.host}, aguardando chamada de teste')
+            self._trial_in_flight = True
+
+    def release_trial(self) -> None:
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self._trial_in_flight = False
+        self.failures = 0
+        if self.state != self.CLOSED:
+            logger.info('Circuito fechado para %s', self.host)
+            self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self._trial_in_flight = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning('Circuito aberto para %s após %s falhas',
+                               self.host, self.failures)
+            self.opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def breaker_for(host: str) -> CircuitBreaker:
+    breaker = _breakers.get(host)
+    if breaker is None:
+        policy = policy_for(host)
+        breaker = _breakers[host] = CircuitBreaker(
+            host, policy.breaker_failure_threshold, policy.breaker_reset_timeout)
+    return breaker
+
+
+async def _hedged(host: str, send: Callable[[], Awaitable[httpx.Response]],
+                  delay: float) -> httpx.Response:
+    """
+    Dispara uma segunda tentativa se a primeira não responder em `delay`
+    segundos e fica com a primeira que terminar sem erro.
+    """
+    first = asyncio.ensure_future(send())
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+    except asyncio.CancelledError:
+        first.cancel()
+        raise
+    if done:
+        return first.result()
+
+    hedged_total.inc(host=host)
+    pending = {first, asyncio.ensure_future(send())}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def execute(host: str, method: str,
+                  send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+    """
+    Executa `send` aplicando a política do host: circuit breaker, novas
+    tentativas com backoff (só em métodos idempotentes) e hedging em GETs.
+    """
+    policy = policy_for(host)
+    breaker = breaker_for(host)
+    method = method.upper()
+    attempts = max(1, policy.retry_attempts) if method in IDEMPOTENT_METHODS else 1
+
+    for attempt in range(attempts):
+        last_attempt = attempt + 1 >= attempts
+        breaker.before_call()
+        try:
+            if policy.hedge_delay is not None and method == 'GET':
+                response = await _hedged(host, send, policy.hedge_delay)
+            else:
+                response = await send()
+        except httpx.TransportError as exc:
+            breaker.record_failure()
+            if last_attempt:
+                raise
+            retries_total.inc(host=host, reason=type(exc).__name__)
+            logger.warning('Falha em %s %s (%r), tentativa %s de %s',
+                           method, host, exc, attempt + 1, attempts)
+            await asyncio.sleep(policy.backoff(attempt))
+            continue
+        except BaseException:
+            # Cancelamento ou erro inesperado não conta como falha do upstream
+            breaker.release_trial()
+            raise
+
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if response.status_code in policy.retry_statuses and not last_attempt:
+            retries_total.inc(host=host, reason=str(response.status_code))
+            logger.warning('%s %s respondeu %s, tentativa %s de %s',
+                           method, host, response.status_code, attempt + 1, attempts)
+            await asyncio.sleep(policy.backoff(attempt))
+            continue
+        return response
@@ -0,0 +1,80 @@
+import datetime
+import decimal
+import enum
+import json
+import uuid
+from typing import Any, Iterable, Optional, Sequence
+
+from fastapi.responses import JSONResponse
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson é opcional
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    # Tipos que o orjson (ou o json da stdlib) não serializa sozinho
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if isinstance(obj, bytes):
+        return obj.decode('utf-8', 'replace')
+    if hasattr(obj, 'keys'):
+        # RowMapping e outros mapeamentos que não são dict
+        return dict(obj)
+    raise TypeError(f'Tipo não serializável em JSON: {type(obj).__name__}')
+
+
+def dumps(content: Any) -> bytes:
+    """
+    JSON em bytes com orjson quando instalado, ou com o json da stdlib (mesma
+    saída compacta do JSONResponse do FastAPI).
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False,
+                      separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse que serializa com `dumps` (orjson, se disponível). Usada como
+    `default_response_class` quando FAST_JSON_RESPONSE está ligado.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """
+    Resposta com um corpo JSON já serializado (bytes), sem nenhuma conversão.
+    """
+    media_type = 'application/json'
+
+
+def rows_to_json(rows: Iterable[Any], fields: Optional[Sequence[str]] = None) -> bytes:
+    """
+    Serializa o resultado do CRUD direto para bytes, sem validar com pydantic
+    nem passar pelo `jsonable_encoder`: use só com dados vindos do banco.
+
+    Entidades ORM viram objetos com as colunas em `fields` (use os campos do
+    schema de resposta para manter o mesmo formato do `response_model`);
+    mappings (projeções com `fields=`) vão como estão.
+    """
+    items = []
+    for row in rows:
+        if hasattr(row, 'keys'):
+            items.append(dict(row))
+        elif fields is not None:
+            items.append({field: getattr(row, field) for field in fields})
+        else:
+            raise ValueError('`fields` é obrigatório para serializar entidades ORM')
+    return dumps(items)
@@ -0,0 +1,59 @@
+import csv
+import io
+from typing import Any, Iterable, Iterator, Type
+
+from pydantic import BaseModel
+
+# Depois da primeira linha, agrupa a saída em blocos deste tamanho
+FLUSH_BYTES = 64 * 1024
+
+
+def _batched(lines: Iterable[bytes], flush_bytes: int = FLUSH_BYTES) -> Iterator[bytes]:
+    """
+    Envia a primeira linha imediatamente e agrupa as seguintes em blocos,
+    para não gerar uma mensagem HTTP por registro.
+    """
+    buffer = bytearray()
+    first = True
+    for line in lines:
+        if first:
+            yield line
+            first = False
+            continue
+        buffer += line
+        if len(buffer) >= flush_bytes:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def ndjson_lines(objs: Iterable[Any], schema: Type[BaseModel]) -> Iterator[bytes]:
+    """
+    Serializa objetos ORM (ou mapeamentos) como JSON delimitado por quebra de linha.
+    """
+    def lines() -> Iterator[bytes]:
+        for obj in objs:
+            yield schema.model_validate(obj, from_attributes=True).model_dump_json().encode('utf-8') + b'\n'
+    return _batched(lines())
+
+
+def csv_lines(objs: Iterable[Any], schema: Type[BaseModel]) -> Iterator[bytes]:
+    """
+    Serializa objetos ORM (ou mapeamentos) como CSV, com cabeçalho pelos campos do schema.
+    """
+    fields = list(schema.model_fields)
+
+    def lines() -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for obj in objs:
+            data = schema.model_validate(obj, from_attributes=True).model_dump(mode='json')
+            writer.writerow([data[field] for field in fields])
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+    return _batched(lines())
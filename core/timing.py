@@ -0,0 +1,146 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from core.config import settings
+from core.metrics import Counter, Histogram, Summary
+
+# Componentes medidos dentro da request, na ordem do header Server-Timing;
+# 'sql' é o tempo dos statements em si, medido pelos eventos das engines
+COMPONENTS = ('db', 'sql', 'http', 'xml')
+
+request_duration = Histogram('http_request_duration_seconds',
+                             'Latência total das requests por rota', ['method', 'route'])
+request_duration_quantiles = Summary('http_request_duration_quantiles_seconds',
+                                     'Quantis da latência total das requests por rota (janela deslizante)',
+                                     ['method', 'route'])
+request_component_quantiles = Summary('http_request_component_seconds',
+                                      'Tempo gasto por componente (db, sql, http, xml) em cada request',
+                                      ['method', 'route', 'component'])
+request_queries = Histogram('http_request_db_queries',
+                            'Statements SQL executados por request',
+                            ['method', 'route'], buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200))
+requests_total = Counter('http_requests_total', 'Requests atendidas', ['method', 'route', 'status'])
+
+
+class RequestStats:
+    __slots__ = ('method', 'path', 'components', 'queries', 'statements')
+
+    def __init__(self, method: str, path: str) -> None:
+        """
+        Tempos e contagens acumulados durante uma request. O mesmo objeto é
+        visto pelas threads dos executores, que recebem uma cópia do contexto.
+        """
+        self.method = method
+        self.path = path
+        self.components: Dict[str, float] = {}
+        self.queries = 0
+        # texto do statement -> execuções nesta request
+        self.statements: Dict[str, int] = {}
+
+    def count_statement(self, statement: str) -> int:
+        self.queries += 1
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+        return self.statements[statement]
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar('request_stats', default=None)
+
+
+def current() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def record(component: str, seconds: float) -> None:
+    """
+    Soma `seconds` ao componente na request atual; fora de uma request não faz nada.
+    """
+    stats = _current.get()
+    if stats is not None:
+        stats.components[component] = stats.components.get(component, 0.0) + seconds
+
+
+@contextmanager
+def timed(component: str) -> Iterator[None]:
+    """
+    Mede o bloco (pode conter `await`) e soma ao componente na request atual.
+    Chamadas concorrentes dentro da mesma request somam os tempos de cada uma.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(component, time.perf_counter() - start)
+
+
+def _server_timing(stats: RequestStats, total: float) -> bytes:
+    timings = stats.components
+    parts = []
+    for name in COMPONENTS:
+        if name == 'sql' and stats.queries:
+            parts.append(f'sql;desc="{stats.queries} queries";dur={timings.get(name, 0.0) * 1000:.1f}')
+        elif name in timings:
+            parts.append(f'{name};dur={timings[name] * 1000:.1f}')
+    parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts).encode('latin-1')
+
+
+class ServerTimingMiddleware:
+    def __init__(self, app: Callable) -> None:
+        """
+        Middleware ASGI que mede cada request: adiciona o header `Server-Timing`
+        (tempo em db, sql, http, xml e total) e alimenta as métricas por rota
+        expostas em /metrics.
+
+        A rota é o template do path (ex.: /api/v1/cars/{id}), para não criar
+        uma série por valor de parâmetro; paths sem rota viram '<unmatched>'.
+        """
+        self.app = app
+        self._route_paths: Optional[Dict[Any, str]] = None
+
+    def _route(self, scope: dict) -> str:
+        endpoint = scope.get('endpoint')
+        if endpoint is None:
+            return '<unmatched>'
+        if self._route_paths is None:
+            app = scope.get('app')
+            self._route_paths = {route.endpoint: route.path
+                                 for route in getattr(app, 'routes', ()) if hasattr(route, 'endpoint')}
+        return self._route_paths.get(endpoint, getattr(endpoint, '__name__', '<unmatched>'))
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope['method'], scope['path'])
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                if settings.SERVER_TIMING_HEADER:
+                    headers = list(message.get('headers', []))
+                    headers.append((b'server-timing', _server_timing(stats, time.perf_counter() - start)))
+                    message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            elapsed = time.perf_counter() - start
+            method = scope['method']
+            route = self._route(scope)
+            request_duration.observe(elapsed, method=method, route=route)
+            request_duration_quantiles.observe(elapsed, method=method, route=route)
+            request_queries.observe(stats.queries, method=method, route=route)
+            for component in COMPONENTS:
+                if component in stats.components:
+                    request_component_quantiles.observe(
+                        stats.components[component], method=method, route=route, component=component)
+            requests_total.inc(method=method, route=route, status=str(status_code))
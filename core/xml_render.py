@@ -1,90 +1,360 @@
+import logging
 import os
+import re
+import threading
+from io import BytesIO
+from typing import AsyncIterator, Dict, Iterable, Optional
 from lxml import etree
 from lxml import objectify
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from core.config import settings
+from core.executor import BoundedExecutor
+from core.timing import timed
 import core.filters as filters
 
+logger = logging.getLogger(__name__)
+
+TEMPLATES_PATH = os.path.join(os.path.dirname(__file__), 'templates')
+
+# Tamanho aproximado de cada bloco entregue pelo modo streaming
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# Um item de marcação ou um trecho de texto do XML gerado pelo template. Nomes
+# de tag não começam com '!' nem '?', então um comentário, CDATA ou instrução
+# incompleto não casa com nada e fica aguardando o próximo pedaço.
+_XML_TOKEN = re.compile(r'''
+    (?P<comment><!--.*?-->)
+  | (?P<cdata><!\[CDATA\[.*?\]\]>)
+  | (?P<declaration><\?xml(?=[\s?]).*?\?>)
+  | (?P<pi><\?.*?\?>)
+  | (?P<doctype><!DOCTYPE(?:[^>\[]|\[[^\]]*\])*>)
+  | (?P<tag><(?![!?])[^>"']*(?:(?:"[^"]*"|'[^']*')[^>"']*)*>)
+  | (?P<text>[^<]+)
+''', re.S | re.X)
+
+_environments: Dict[str, Environment] = {}
+
+# Executor opcional para renderização/parse fora do event loop (XML_EXECUTOR)
+xml_executor = (BoundedExecutor('xml', max_workers=settings.XML_EXECUTOR_WORKERS,
+                                kind=settings.XML_EXECUTOR)
+                if settings.XML_EXECUTOR else None)
+
+
+def get_environment(path: str = TEMPLATES_PATH) -> Environment:
+    """
+    Ambiente Jinja2 do diretório `path`, criado uma única vez por processo.
+
+    Os templates compilados ficam em memória; com `TEMPLATES_AUTO_RELOAD`
+    (só em desenvolvimento) alterações nos arquivos são recarregadas.
+    """
+    env = _environments.get(path)
+    if env is None:
+        bytecode_cache = None
+        if settings.TEMPLATES_BYTECODE_CACHE_DIR:
+            os.makedirs(settings.TEMPLATES_BYTECODE_CACHE_DIR, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(
+                settings.TEMPLATES_BYTECODE_CACHE_DIR)
+        env = Environment(
+            loader=FileSystemLoader(path),
+            auto_reload=settings.TEMPLATES_AUTO_RELOAD,
+            cache_size=-1,
+            bytecode_cache=bytecode_cache)
+        env.filters["normalize"] = filters.strip_line_feed
+        env.filters["normalize_str"] = filters.normalize_str
+        env.filters["format_percent"] = filters.format_percent
+        env.filters["format_datetime"] = filters.format_datetime
+        env.filters["format_date"] = filters.format_date
+        env.filters["comma"] = filters.format_with_comma
+        _environments[path] = env
+    return env
+
+
+def precompile_templates(path: str = TEMPLATES_PATH) -> int:
+    """
+    Compila todos os templates .xml de `path` (chamado no startup da aplicação).
+    """
+    if not os.path.isdir(path):
+        return 0
+    env = get_environment(path)
+    names = env.list_templates(extensions=['xml'])
+    for name in names:
+        env.get_template(name)
+    logger.info('%s templates XML pré-compilados de %s', len(names), path)
+    return len(names)
+
+
+class _BlankTextStripper:
+    """
+    Versão incremental da limpeza feita em `render_xml`, aplicada aos pedaços
+    gerados pelo Jinja2 sem montar o documento inteiro: remove comentários,
+    declaração, DOCTYPE e textos só com espaços entre tags. Valores de
+    atributos, CDATA e instruções de processamento passam intactos.
+
+    O documento é o mesmo de `render_xml` (mesma forma canônica C14N), mas não
+    os mesmos bytes: entidades, elementos vazios e CDATA saem como estão no
+    template, que o lxml normalizaria. XML malformado não é detectado aqui.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ''
+        # O texto em andamento já tem algo além de espaços (é mantido inteiro)
+        self._in_text = False
+
+    def feed(self, chunk: str) -> str:
+        buffer = self._buffer + chunk
+        end = len(buffer)
+        pos = 0
+        out = []
+        while pos < end:
+            match = _XML_TOKEN.match(buffer, pos)
+            if match is None:
+                break  # marcação incompleta: aguarda o próximo pedaço
+            kind, token = match.lastgroup, match.group()
+            if kind == 'text':
+                keep = self._in_text or not token.isspace()
+                if not keep and match.end() == end:
+                    break  # só espaços até aqui: o texto pode continuar no próximo pedaço
+                # Comentários não interrompem o texto; só tags, CDATA e instruções
+                self._in_text = keep
+                if keep:
+                    out.append(token)
+            elif kind in ('tag', 'cdata', 'pi'):
+                self._in_text = False
+                out.append(token)
+            pos = match.end()
+        self._buffer = buffer[pos:]
+        return ''.join(out)
+
+    def close(self) -> str:
+        # Sobra só espaço em branco ou marcação incompleta (XML malformado)
+        rest, self._buffer = self._buffer, ''
+        return '' if rest.isspace() else rest
+
+
+_XML_SPECIAL = re.compile('[&<>"\']')
+
+
+def _normalize_value(value):
+    return filters.normalize_str(value.strip())
+
+
+def _normalize_escape_value(value):
+    value = filters.normalize_str(value.strip())
+    if _XML_SPECIAL.search(value) is None:
+        return value
+    return (value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+            .replace("\"", "&quot;").replace("'", "&apos;"))
+
+
+def _transform_strings(vals, fn, copy=False):
+    """
+    Aplica `fn` a todas as strings de dicionários/listas aninhados em uma única
+    passada iterativa (pilha explícita, sem limite de recursão).
+
+    Com `copy=False` altera `vals` no lugar; com `copy=True` monta novos
+    dicionários/listas e não toca na entrada.
+    """
+    if type(vals) is str:
+        return fn(vals)
+    if type(vals) not in (dict, list):
+        return vals
+    root = (dict(vals) if type(vals) is dict else list(vals)) if copy else vals
+    stack = [root]
+    while stack:
+        container = stack.pop()
+        keys = container.keys() if type(container) is dict else range(len(container))
+        for key in keys:
+            value = container[key]
+            value_type = type(value)
+            if value_type is str:
+                container[key] = fn(value)
+            elif value_type is dict or value_type is list:
+                if copy:
+                    value = container[key] = dict(value) if value_type is dict else list(value)
+                stack.append(value)
+    return root
+
+
+def prepare_payload(vals, copy=True):
+    """
+    Normaliza (strip + `normalize_str`) e escapa para XML todas as strings do
+    payload, em qualquer nível, numa só passada.
+
+    Por padrão devolve uma cópia: escapar no lugar alteraria os dicionários e
+    listas de quem chamou, e um segundo render escaparia de novo (`&amp;amp;`).
+    """
+    return _transform_strings(vals, _normalize_escape_value, copy=copy)
+
+
+def _render_xml_sync(path, template_name, banklisp):
+    """
+    Parte síncrona de `XmlRender.render_xml`; no nível do módulo para poder
+    ser enviada a um pool de processos (só o dicionário e a string trafegam).
+    """
+    banklisp = prepare_payload(banklisp)
+    template = get_environment(path).get_template(template_name)
+    xml = template.render(**banklisp)
+    parser = etree.XMLParser(remove_blank_text=True, remove_comments=True,
+                             strip_cdata=False)
+    root = etree.fromstring(xml, parser=parser)
+    for element in root.iter("*"):  # remove espaços em branco
+        if element.text is not None and not element.text.strip():
+            element.text = None
+    return etree.tostring(root, encoding=str)
+
+
+_parsers = threading.local()
+
+
+def _objectify_parser():
+    # Parsers do lxml não devem ser compartilhados entre threads
+    parser = getattr(_parsers, 'objectify', None)
+    if parser is None:
+        parser = _parsers.objectify = objectify.makeparser(
+            encoding='utf-8', remove_blank_text=True)
+    return parser
+
+
+def _sanitize_response_sync(response):
+    """
+    Faz o parse uma única vez, já com o parser do objectify, e remove os
+    namespaces renomeando as tags da própria árvore.
+    """
+    tree = objectify.fromstring(response.encode('UTF-8'), parser=_objectify_parser())
+    # Remove namespaces inuteis na resposta
+    for elem in tree.iter():
+        if not isinstance(elem.tag, str):
+            continue
+        i = elem.tag.find('}')
+        if i >= 0:
+            elem.tag = elem.tag[i + 1:]
+    objectify.deannotate(tree, cleanup_namespaces=True)
+    return tree
+
+
+def _extract_fields_sync(response, paths):
+    source = response
+    if isinstance(response, str):
+        source = BytesIO(response.encode('UTF-8'))
+    elif isinstance(response, bytes):
+        source = BytesIO(response)
+
+    wanted = {}
+    for path in paths:
+        parts = tuple(part for part in path.strip('/').split('/') if part)
+        wanted[path] = (parts, path.startswith('/'))
+    result: Dict[str, Optional[str]] = dict.fromkeys(paths)
+    remaining = set(paths)
+    stack = []
+
+    for event, elem in etree.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            stack.append(etree.QName(elem).localname)
+            continue
+        for path in list(remaining):
+            parts, absolute = wanted[path]
+            if absolute and len(stack) != len(parts):
+                continue
+            if tuple(stack[-len(parts):]) == parts:
+                result[path] = elem.text
+                remaining.discard(path)
+        stack.pop()
+        # Descarta o que já foi lido para manter a memória constante
+        elem.clear(keep_tail=True)
+        parent = elem.getparent()
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent[0]
+        if not remaining:
+            break
+    return result
+
+
+async def _run_cpu(fn, *args):
+    with timed('xml'):
+        if xml_executor is None:
+            return fn(*args)
+        return await xml_executor.run(fn, *args)
+
 
 class XmlRender:
 
     @classmethod
     async def recursively_normalize(cls, vals):
-        for item in vals:
-            if type(vals[item]) is str:
-                vals[item] = vals[item].strip()
-                vals[item] = filters.normalize_str(vals[item])
-            elif type(vals[item]) is dict:
-                await cls.recursively_normalize(vals[item])
-            elif type(vals[item]) is list:
-                for a in vals[item]:
-                    await cls.recursively_normalize(a)
-        return vals
+        return _transform_strings(vals, _normalize_value)
 
     @classmethod
     async def recursively_normalize_mult(cls, vals):
-        if vals is None:
-            return vals
-
-        for item in vals:
-            if isinstance(item, dict):  # Verifica se o item é um dicionário
-                # Chama recursivamente a função com o dicionário
-                await cls.recursively_normalize_mult(item)
-            elif isinstance(item, list):  # Verifica se o item é uma lista
-                for a in item:
-                    # Chama recursivamente a função com o item da lista
-                    await cls.recursively_normalize_mult(a)
-
+        # Mantido por compatibilidade: a normalização dos items acontece em
+        # `prepare_payload`, junto com o restante do payload
         return vals
 
     @classmethod
     async def _render(cls, method, **kwargs):
-        path = os.path.join(os.path.dirname(__file__), 'templates')
-        xml_send = await cls.render_xml(path, '%s.xml' % method, **kwargs)
+        xml_send = await cls.render_xml(TEMPLATES_PATH, '%s.xml' % method, **kwargs)
         return xml_send.encode('utf-8')
 
     @classmethod
     async def render_xml(cls, path, template_name, **banklisp):
-        banklisp = await cls.recursively_normalize(banklisp)
-        env = Environment(
-            loader=FileSystemLoader(path))
-        env.filters["normalize"] = filters.strip_line_feed
-        env.filters["normalize_str"] = filters.normalize_str
-        env.filters["format_percent"] = filters.format_percent
-        env.filters["format_datetime"] = filters.format_datetime
-        env.filters["format_date"] = filters.format_date
-        env.filters["comma"] = filters.format_with_comma
-        template = env.get_template(template_name)
-        banklisp = cls.escape(str_xml=banklisp)
-        xml = template.render(**banklisp)
-        parser = etree.XMLParser(remove_blank_text=True, remove_comments=True,
-                                 strip_cdata=False)
-        root = etree.fromstring(xml, parser=parser)
-        for element in root.iter("*"):  # remove espaços em branco
-            if element.text is not None and not element.text.strip():
-                element.text = None
-        return etree.tostring(root, encoding=str)
+        return await _run_cpu(_render_xml_sync, path, template_name, banklisp)
 
     @classmethod
     async def _render_mult(cls, method, headers, items, **kwargs):
-        path = os.path.join(os.path.dirname(__file__), 'templates')
         # Aguarda a normalização dos items
         normalized_items = await cls.recursively_normalize_mult(items)
-        xml_send = await cls.render_xml(path, '%s.xml' % method, headers=headers, items=normalized_items, **kwargs)
+        xml_send = await cls.render_xml(TEMPLATES_PATH, '%s.xml' % method, headers=headers, items=normalized_items, **kwargs)
         return xml_send
 
     @classmethod
-    async def sanitize_response(cls, response):
-        parser = etree.XMLParser(encoding='utf-8')
-        tree = etree.fromstring(response.encode('UTF-8'), parser=parser)
-        # Remove namespaces inuteis na resposta
-        for elem in tree.getiterator():
-            if not hasattr(elem.tag, 'find'):
+    async def stream_render_mult(cls, method, headers, items, **kwargs) -> AsyncIterator[bytes]:
+        """
+        Versão streaming de `_render_mult`: entrega o XML em blocos de bytes
+        conforme o template é gerado, sem manter o documento inteiro em memória.
+        O documento é o mesmo, mas a serialização pode diferir (ver
+        `_BlankTextStripper`).
+
+        O resultado pode ir direto para um `StreamingResponse` ou para o
+        `content=` de uma requisição httpx.
+        """
+        banklisp = prepare_payload(dict(headers=headers, items=items, **kwargs))
+        template = get_environment(TEMPLATES_PATH).get_template('%s.xml' % method)
+        stripper = _BlankTextStripper()
+        pending = []
+        size = 0
+        for chunk in template.generate(**banklisp):
+            chunk = stripper.feed(chunk)
+            if not chunk:
                 continue
-            i = elem.tag.find('}')
-            if i >= 0:
-                elem.tag = elem.tag[i + 1:]
-        objectify.deannotate(tree, cleanup_namespaces=True)
-        return response, objectify.fromstring(etree.tostring(tree))
+            pending.append(chunk)
+            size += len(chunk)
+            if size >= STREAM_CHUNK_SIZE:
+                yield ''.join(pending).encode('utf-8')
+                pending = []
+                size = 0
+        pending.append(stripper.close())
+        tail = ''.join(pending)
+        if tail:
+            yield tail.encode('utf-8')
+
+    @classmethod
+    async def sanitize_response(cls, response):
+        # No modo 'process' a árvore volta ao processo principal via pickle
+        # (serializa e é reparseada), então 'thread' costuma compensar mais aqui
+        return response, await _run_cpu(_sanitize_response_sync, response)
+
+    @classmethod
+    async def extract_fields(cls, response, paths: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Extrai só os campos pedidos de uma resposta XML com `iterparse`, sem
+        montar a árvore inteira; útil para respostas SOAP de vários MB.
+
+        `paths` são caminhos de nomes locais (sem namespace) separados por '/',
+        como 'Body/ConsultaResponse/Status'. Casam pelo final do caminho, ou a
+        partir da raiz se começarem com '/'. Retorna o texto da primeira
+        ocorrência de cada caminho (None se não encontrado). `response` pode ser
+        str, bytes ou um arquivo.
+        """
+        return await _run_cpu(_extract_fields_sync, response, tuple(paths))
 
     @classmethod
     def escape(cls, str_xml):
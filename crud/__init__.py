@@ -1 +1 @@
-from .crud_cars import car
+from .crud_cars import car, car_async
@@ -0,0 +1,249 @@
+import logging
+from typing import (Any, AsyncIterable, AsyncIterator, Dict, Generic, Iterable,
+                    List, Optional, Sequence, Tuple, Type, Union)
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import inspect, insert, select
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from crud.bulk import (MAX_IN_PARAMS, achunked, as_dict, bulk_update_batches,
+                       chunked)
+from crud.base import CreateSchemaType, ModelType, UpdateSchemaType
+from crud.pagination import cursor_for, keyset_clause, keyset_order
+from crud.query import last_filters_query, multi_filters_query, projection
+
+
+class AsyncCRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    def __init__(self, model: Type[ModelType]):
+        """
+        Versão assíncrona do CRUDBase, para sessões `AsyncSession` (ex.: Postgres via asyncpg).
+
+        Os métodos têm a mesma assinatura do CRUDBase, mas devem ser aguardados
+        (`await crud.get(db, id)`), liberando o event loop durante as consultas.
+
+        **Parameters**
+
+        * `model`: A SQLAlchemy model class
+        """
+        self.model = model
+        self._column_keys = [column.key for column in inspect(model).column_attrs]
+
+    async def get(self, db: AsyncSession, id: Any, *, fields: Optional[Sequence[str]] = None
+                  ) -> Union[ModelType, RowMapping, None]:
+        logging.info('Obtendo %s de id=%s', self.model.__name__, id)
+        if fields:
+            result = await db.execute(
+                select(*projection(self.model, fields)).where(self.model.id == id))
+            return result.mappings().first()
+        result = await db.execute(
+            select(self.model).filter(self.model.id == id).limit(1))
+        return result.scalars().first()
+
+    async def get_first_by_filter(
+        self, db: AsyncSession, *, order_by: str = "id", filterby: str = "enviado", filter: str
+    ) -> Optional[ModelType]:
+        logging.info(
+            'Obtendo lista de %s cujo %s=%s', self.model.__name__, filterby, filter)
+        result = await db.execute(
+            select(self.model)
+            .order_by(getattr(self.model, order_by))
+            .filter(getattr(self.model, filterby) == filter)
+            .limit(1))
+        return result.scalars().first()
+
+    async def get_multi(
+            self, db: AsyncSession, *, skip: int = 0, limit: int = 100, order_by: str = "id",
+            fields: Optional[Sequence[str]] = None
+    ) -> List[Union[ModelType, RowMapping]]:
+        logging.info('Obtendo lista de %s', self.model.__name__)
+        columns = projection(self.model, fields) if fields else (self.model,)
+        result = await db.execute(
+            select(*columns).order_by(getattr(self.model, order_by)).offset(skip).limit(limit))
+        return result.mappings().all() if fields else result.scalars().all()
+
+    async def get_multi_keyset(
+            self, db: AsyncSession, *, after: Optional[str] = None, limit: int = 100, order_by: str = "id",
+            fields: Optional[Sequence[str]] = None
+    ) -> Tuple[List[Union[ModelType, RowMapping]], Optional[str]]:
+        logging.info('Obtendo lista de %s por cursor', self.model.__name__)
+        columns = projection(self.model, fields, (order_by, 'id')) if fields else (self.model,)
+        result = await db.execute(
+            select(*columns)
+            .filter(*keyset_clause(self.model, order_by, after))
+            .order_by(*keyset_order(self.model, order_by))
+            .limit(limit + 1))
+        rows = result.mappings().all() if fields else result.scalars().all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, cursor_for(rows[-1], order_by)
+        return rows, None
+
+    async def stream_multi(
+            self, db: AsyncSession, *, order_by: str = "id", chunk_size: Optional[int] = None
+    ) -> AsyncIterator[ModelType]:
+        logging.info('Exportando lista de %s', self.model.__name__)
+        stmt = select(self.model).order_by(getattr(self.model, order_by))
+        result = await db.stream_scalars(stmt.execution_options(
+            yield_per=chunk_size or settings.CRUD_STREAM_CHUNK_SIZE))
+        async for obj in result:
+            yield obj
+
+    async def stream_filters(
+        self,
+        db: AsyncSession,
+        *,
+        filters: List[Dict[str, Any]],
+        order_by: str = "id",
+        chunk_size: Optional[int] = None
+    ) -> AsyncIterator[ModelType]:
+        logging.info(
+            'Exportando lista de %s de acordo com os filtros', self.model.__name__)
+        stmt, params = multi_filters_query(self.model, filters, order_by=order_by)
+        result = await db.stream_scalars(stmt.execution_options(
+            yield_per=chunk_size or settings.CRUD_STREAM_CHUNK_SIZE), params)
+        async for obj in result:
+            yield obj
+
+    async def get_multi_filter(
+        self, db: AsyncSession, *, order_by: str = "id", filterby: str = "enviado", filter: str
+    ) -> List[ModelType]:
+        logging.info(
+            'Obtendo lista de %s cujo %s=%s', self.model.__name__, filterby, filter)
+        result = await db.execute(
+            select(self.model)
+            .order_by(getattr(self.model, order_by))
+            .filter(getattr(self.model, filterby) == filter))
+        return result.scalars().all()
+
+    async def get_multi_filters(
+        self,
+        db: AsyncSession,
+        *,
+        filters: List[Dict[str, Any]],
+        skip: int = 0,
+        limit: Optional[int] = None,
+        order_by: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[Union[ModelType, RowMapping]]:
+        logging.info(
+            'Obtendo lista de %s de acordo com os filtros', self.model.__name__)
+        stmt, params = multi_filters_query(
+            self.model, filters, order_by=order_by, skip=skip, limit=limit)
+        if fields:
+            result = await db.execute(
+                stmt.with_only_columns(*projection(self.model, fields)), params)
+            return result.mappings().all()
+        result = await db.execute(stmt, params)
+        return result.scalars().all()
+
+    async def get_last_by_filters(
+        self,
+        db: AsyncSession,
+        *,
+        filters: Dict[str, Dict[str, Union[str, int]]],
+    ) -> Optional[ModelType]:
+        logging.info(
+            'Obtendo último registro de %s de acordo com os filtros', self.model.__name__)
+        stmt, params = last_filters_query(self.model, filters)
+        result = await db.execute(stmt.limit(1), params)
+        return result.scalars().first()
+
+    async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
+        logging.info('Criando objeto em %s', self.model.__name__)
+        obj_in_data = jsonable_encoder(obj_in)
+        db_obj = self.model(**obj_in_data)  # type: ignore
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def create_multi(
+        self,
+        db: AsyncSession,
+        *,
+        obj_in: Union[Iterable[Union[CreateSchemaType, Dict[str, Any]]],
+                      AsyncIterable[Union[CreateSchemaType, Dict[str, Any]]]],
+        chunk_size: Optional[int] = None,
+        return_ids: bool = True,
+    ) -> Dict[str, Any]:
+        logging.info('Criando lista de objetos %s', self.model.__name__)
+        chunk_size = chunk_size or settings.CRUD_BULK_CHUNK_SIZE
+        if return_ids:
+            stmt = insert(self.model).returning(
+                self.model.id, sort_by_parameter_order=True)
+        else:
+            stmt = insert(self.model.__table__)
+        ids = []
+        try:
+            async for chunk in achunked(obj_in, chunk_size):
+                result = await db.execute(stmt, [as_dict(item) for item in chunk])
+                if return_ids:
+                    ids.extend(result.scalars().all())
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        return {'msg': 'Chamados inseridos com sucesso', 'ids': ids}
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        logging.info('Atualizando o objeto de %s', self.model.__name__)
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        for field in self._column_keys:
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        obj_data = jsonable_encoder(db_obj)
+        return obj_data
+
+    async def update_multi(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: Iterable[Union[UpdateSchemaType, Dict[str, Any]]],
+        filtro: str,
+        chunk_size: Optional[int] = None,
+        return_rows: bool = True,
+    ) -> Union[List[List[ModelType]], int]:
+        logging.info('Atualizando lista de objetos %s', self.model.__name__)
+        chunk_size = chunk_size or settings.CRUD_BULK_CHUNK_SIZE
+        matched_values = []
+        rowcount = 0
+        try:
+            for stmt, params, values in bulk_update_batches(self.model, objs_in, filtro, chunk_size):
+                result = await db.execute(stmt, params)
+                rowcount = -1 if rowcount < 0 or result.rowcount < 0 else rowcount + result.rowcount
+                matched_values.extend(values)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        if not return_rows:
+            return rowcount
+
+        column = getattr(self.model, filtro)
+        updated_objs = []
+        for values in chunked(dict.fromkeys(matched_values), MAX_IN_PARAMS):
+            result = await db.execute(
+                select(self.model)
+                .filter(column.in_(values))
+                .execution_options(populate_existing=True))
+            updated_objs.extend(result.scalars().all())
+        return [updated_objs]
+
+    async def remove(self, db: AsyncSession, *, id: int) -> Optional[ModelType]:
+        logging.info('Removendo objeto %s de id=%s', self.model.__name__, id)
+        obj = await db.get(self.model, id)
+        await db.delete(obj)
+        await db.commit()
+        return obj
@@ -1,11 +1,17 @@
 import logging
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import (Any, Dict, Generic, Iterable, Iterator, List, Optional, Sequence,
+                    Tuple, Type, TypeVar, Union)
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from sqlalchemy.engine import RowMapping
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import inspect, insert, select
+from core.config import settings
+from crud.bulk import MAX_IN_PARAMS, as_dict, bulk_update_batches, chunked
+from crud.cache import CRUDCache
+from crud.pagination import cursor_for, keyset_clause, keyset_order
+from crud.query import last_filters_query, multi_filters_query, projection
 from db.base_class import Base
-from sqlalchemy import update  # Importe o update do SQLAlchemy aqui
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -13,7 +19,7 @@ UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    def __init__(self, model: Type[ModelType]):
+    def __init__(self, model: Type[ModelType], cache: Optional[CRUDCache] = None):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
 
@@ -21,71 +27,142 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
         * `model`: A SQLAlchemy model class
         * `schema`: A Pydantic model (schema) class
+        * `cache`: Cache de leitura opcional para `get`, `get_first_by_filter`
+          e `get_multi_filter`, invalidado pelas escritas deste CRUD
         """
         self.model = model
+        self.cache = cache
+        self._column_keys = [column.key for column in inspect(model).column_attrs]
 
-    def get(self, db: Session, id: Any) -> Optional[ModelType]:
-        logging.info(f'Obtendo {self.model.__name__} de id={id}')
-        return db.query(self.model).filter(self.model.id == id).first()
+    def _invalidate(self) -> None:
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    def get(self, db: Session, id: Any, *, fields: Optional[Sequence[str]] = None
+            ) -> Union[ModelType, RowMapping, None]:
+        """
+        Com `fields` seleciona só essas colunas e retorna um mapping leve
+        (RowMapping) em vez da entidade ORM; vale também para `get_multi`,
+        `get_multi_keyset` e `get_multi_filters`. Projeções não usam o cache.
+        """
+        logging.info('Obtendo %s de id=%s', self.model.__name__, id)
+        if fields:
+            return db.execute(
+                select(*projection(self.model, fields)).where(self.model.id == id)
+            ).mappings().first()
+        query = db.query(self.model).filter(self.model.id == id)
+        if self.cache is None:
+            return query.first()
+        return self.cache.fetch_one(db, self.cache.key('get', id), query.first)
 
     def get_first_by_filter(
         self, db: Session, *, order_by: str = "id", filterby: str = "enviado", filter: str
     ) -> List[ModelType]:
         logging.info(
-            f'Obtendo lista de {self.model.__name__} cujo {filterby}={filter}')
-        return db.query(self.model).order_by(getattr(self.model, order_by)).filter(getattr(self.model, filterby) == filter).first()
+            'Obtendo lista de %s cujo %s=%s', self.model.__name__, filterby, filter)
+        query = db.query(self.model).order_by(getattr(self.model, order_by)).filter(getattr(self.model, filterby) == filter)
+        if self.cache is None:
+            return query.first()
+        return self.cache.fetch_one(
+            db, self.cache.key('get_first_by_filter', order_by, filterby, filter), query.first)
 
     def get_multi(
-            self, db: Session, *, skip: int = 0, limit: int = 100, order_by: str = "id"
-    ) -> List[ModelType]:
-        logging.info(f'Obtendo lista de {self.model.__name__}')
+            self, db: Session, *, skip: int = 0, limit: int = 100, order_by: str = "id",
+            fields: Optional[Sequence[str]] = None
+    ) -> List[Union[ModelType, RowMapping]]:
+        logging.info('Obtendo lista de %s', self.model.__name__)
+        if fields:
+            return db.execute(
+                select(*projection(self.model, fields))
+                .order_by(getattr(self.model, order_by)).offset(skip).limit(limit)
+            ).mappings().all()
         return db.query(self.model).order_by(getattr(self.model, order_by)).offset(skip).limit(limit).all()
 
+    def get_multi_keyset(
+            self, db: Session, *, after: Optional[str] = None, limit: int = 100, order_by: str = "id",
+            fields: Optional[Sequence[str]] = None
+    ) -> Tuple[List[Union[ModelType, RowMapping]], Optional[str]]:
+        """
+        Paginação por cursor (keyset): o custo de qualquer página é o mesmo da primeira.
+
+        Retorna os registros e o `next_cursor` (None na última página), que deve
+        ser passado como `after` na próxima chamada com o mesmo `order_by`, que
+        precisa ser uma coluna NOT NULL (senão `InvalidOrderByError`).
+        Com `fields`, as colunas do cursor (`order_by` e id) vêm sempre junto.
+        """
+        logging.info('Obtendo lista de %s por cursor', self.model.__name__)
+        columns = projection(self.model, fields, (order_by, 'id')) if fields else (self.model,)
+        result = db.execute(
+            select(*columns)
+            .filter(*keyset_clause(self.model, order_by, after))
+            .order_by(*keyset_order(self.model, order_by))
+            .limit(limit + 1))
+        rows = result.mappings().all() if fields else result.scalars().all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, cursor_for(rows[-1], order_by)
+        return rows, None
+
+    def stream_multi(
+            self, db: Session, *, order_by: str = "id", chunk_size: Optional[int] = None
+    ) -> Iterator[ModelType]:
+        """
+        Percorre todos os registros com cursor no servidor (`yield_per`), mantendo
+        em memória só um lote de `chunk_size` (padrão `CRUD_STREAM_CHUNK_SIZE`).
+        """
+        logging.info('Exportando lista de %s', self.model.__name__)
+        stmt = select(self.model).order_by(getattr(self.model, order_by))
+        yield from db.execute(stmt.execution_options(
+            yield_per=chunk_size or settings.CRUD_STREAM_CHUNK_SIZE)).scalars()
+
+    def stream_filters(
+        self,
+        db: Session,
+        *,
+        filters: List[Dict[str, Any]],
+        order_by: str = "id",
+        chunk_size: Optional[int] = None
+    ) -> Iterator[ModelType]:
+        logging.info(
+            'Exportando lista de %s de acordo com os filtros', self.model.__name__)
+        stmt, params = multi_filters_query(self.model, filters, order_by=order_by)
+        yield from db.execute(stmt.execution_options(
+            yield_per=chunk_size or settings.CRUD_STREAM_CHUNK_SIZE), params).scalars()
+
     def get_multi_filter(
         self, db: Session, *, order_by: str = "id", filterby: str = "enviado", filter: str
     ) -> List[ModelType]:
         logging.info(
-            f'Obtendo lista de {self.model.__name__} cujo {filterby}={filter}')
-        return db.query(self.model).order_by(getattr(self.model, order_by)).filter(getattr(self.model, filterby) == filter).all()
+            'Obtendo lista de %s cujo %s=%s', self.model.__name__, filterby, filter)
+        query = db.query(self.model).order_by(getattr(self.model, order_by)).filter(getattr(self.model, filterby) == filter)
+        if self.cache is None:
+            return query.all()
+        return self.cache.fetch_all(
+            db, self.cache.key('get_multi_filter', order_by, filterby, filter), query.all)
 
     def get_multi_filters(
         self,
         db: Session,
         *,
-        filters: List[Dict[str, Any]]
-    ) -> List[ModelType]:
-        query = db.query(self.model)
+        filters: List[Dict[str, Any]],
+        skip: int = 0,
+        limit: Optional[int] = None,
+        order_by: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[Union[ModelType, RowMapping]]:
+        """
+        `filters` é uma lista de {"field", "operator" (padrão '='), "value"}.
+        Com `skip`/`limit` a lista é paginada (ordenada por `order_by`, ou pelo
+        id se omitido); sem `limit` retorna todos os registros.
+        """
         logging.info(
-            f'Obtendo lista de {self.model.__name__} de acordo com os filtros')
-
-        # Definir um mapa de operadores
-        operator_map = {
-            '=': lambda field, value: field == value,
-            '!=': lambda field, value: field != value,
-            '<': lambda field, value: field < value,
-            '<=': lambda field, value: field <= value,
-            '>': lambda field, value: field > value,
-            '>=': lambda field, value: field >= value,
-            'like': lambda field, value: field.like(value),
-            'ilike': lambda field, value: field.ilike(value),
-            'in': lambda field, value: field.in_(value),
-            'notin': lambda field, value: field.notin_(value),
-            # Adicionar mais operadores conforme necessário
-        }
-
-        for filter in filters:
-            field_name = filter["field"]
-            operator = filter.get("operator", "=")  # Operador padrão é '='
-            value = filter["value"]
-
-            field = getattr(self.model, field_name)
-
-            if operator in operator_map:
-                query = query.filter(operator_map[operator](field, value))
-            else:
-                raise ValueError(f"Operador desconhecido: {operator}")
-
-        return query.all()
+            'Obtendo lista de %s de acordo com os filtros', self.model.__name__)
+        stmt, params = multi_filters_query(
+            self.model, filters, order_by=order_by, skip=skip, limit=limit)
+        if fields:
+            return db.execute(
+                stmt.with_only_columns(*projection(self.model, fields)), params).mappings().all()
+        return db.execute(stmt, params).scalars().all()
 
     def get_last_by_filters(
         self,
@@ -94,58 +171,55 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         filters: Dict[str, Dict[str, Union[str, int]]],
     ) -> Optional[ModelType]:
         logging.info(
-            f'Obtendo último registro de {self.model.__name__} de acordo com os filtros')
-        query = db.query(self.model)
-
-        for filter_name, filter_data in filters.items():
-            operator = filter_data['operator']
-            filter_value = filter_data['value']
-
-            if operator == '>':
-                query = query.filter(
-                    getattr(self.model, filter_name) > filter_value)
-            elif operator == '<':
-                query = query.filter(
-                    getattr(self.model, filter_name) < filter_value)
-            elif operator == '>=':
-                query = query.filter(
-                    getattr(self.model, filter_name) >= filter_value)
-            elif operator == '<=':
-                query = query.filter(
-                    getattr(self.model, filter_name) <= filter_value)
-            elif operator == '==':
-                query = query.filter(
-                    getattr(self.model, filter_name) == filter_value)
-            elif operator == '!=':
-                query = query.filter(
-                    getattr(self.model, filter_name) != filter_value)
-            elif operator == 'like':
-                query = query.filter(
-                    getattr(self.model, filter_name).like(f"%{filter_value}%"))
-            elif operator == 'is_null':
-                query = query.filter(
-                    getattr(self.model, filter_name).is_(None))
-            else:
-                # Handle other operators as needed
-                pass
-
-        return query.order_by(desc(self.model.id)).first()
+            'Obtendo último registro de %s de acordo com os filtros', self.model.__name__)
+        stmt, params = last_filters_query(self.model, filters)
+        return db.execute(stmt.limit(1), params).scalars().first()
 
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
-        logging.info(f'Criando objeto em {self.model.__name__}')
+        logging.info('Criando objeto em %s', self.model.__name__)
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)  # type: ignore
         db.add(db_obj)
         db.commit()
+        self._invalidate()
         db.refresh(db_obj)
         return db_obj
 
-    def create_multi(self, db: Session, *, obj_in: List[CreateSchemaType]) -> List[ModelType]:
-        logging.info(f'Criando lista de objetos {self.model.__name__}')
-        db_objs = [self.model(**jsonable_encoder(item)) for item in obj_in]
-        db.bulk_save_objects(db_objs)
-        db.commit()
-        return {'msg': 'Chamados inseridos com sucesso'}
+    def create_multi(
+        self,
+        db: Session,
+        *,
+        obj_in: Iterable[Union[CreateSchemaType, Dict[str, Any]]],
+        chunk_size: Optional[int] = None,
+        return_ids: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Insere os objetos em lotes de `chunk_size` (padrão `CRUD_BULK_CHUNK_SIZE`)
+        em uma única transação, consumindo `obj_in` sob demanda.
+
+        Com `return_ids` cada lote é um INSERT multi-row com RETURNING/OUTPUT e
+        os ids gerados voltam em `ids`, na ordem de `obj_in`; sem ele o lote vai
+        como executemany (fast_executemany no pyodbc).
+        """
+        logging.info('Criando lista de objetos %s', self.model.__name__)
+        chunk_size = chunk_size or settings.CRUD_BULK_CHUNK_SIZE
+        if return_ids:
+            stmt = insert(self.model).returning(
+                self.model.id, sort_by_parameter_order=True)
+        else:
+            stmt = insert(self.model.__table__)
+        ids = []
+        try:
+            for chunk in chunked(obj_in, chunk_size):
+                result = db.execute(stmt, [as_dict(item) for item in chunk])
+                if return_ids:
+                    ids.extend(result.scalars().all())
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        self._invalidate()
+        return {'msg': 'Chamados inseridos com sucesso', 'ids': ids}
 
     def update(
         self,
@@ -154,17 +228,17 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_obj: ModelType,
         obj_in: Union[UpdateSchemaType, Dict[str, Any]]
     ) -> ModelType:
-        logging.info(f'Atualizando o objeto de {self.model.__name__}')
-        obj_data = jsonable_encoder(db_obj)
+        logging.info('Atualizando o objeto de %s', self.model.__name__)
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
+        for field in self._column_keys:
             if field in update_data:
                 setattr(db_obj, field, update_data[field])
         db.add(db_obj)
         db.commit()
+        self._invalidate()
         db.refresh(db_obj)
         obj_data = jsonable_encoder(db_obj)
         return obj_data
@@ -173,30 +247,47 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         self,
         db: Session,
         *,
-        objs_in: List[Union[UpdateSchemaType, Dict[str, Any]]],
-        filtro: str
-    ) -> List[ModelType]:
-        logging.info(f'Atualizando lista de objetos {self.model.__name__}')
+        objs_in: Iterable[Union[UpdateSchemaType, Dict[str, Any]]],
+        filtro: str,
+        chunk_size: Optional[int] = None,
+        return_rows: bool = True,
+    ) -> Union[List[List[ModelType]], int]:
+        """
+        Atualiza vários registros em uma única transação.
+
+        Cada lote de `chunk_size` objetos (padrão `CRUD_BULK_CHUNK_SIZE`) vira um
+        UPDATE executemany por conjunto de colunas alteradas, casando pela coluna
+        `filtro`. Com `return_rows=False` retorna a soma do rowcount (-1 se o
+        driver não informar) em vez de reler os registros atualizados.
+        """
+        logging.info('Atualizando lista de objetos %s', self.model.__name__)
+        chunk_size = chunk_size or settings.CRUD_BULK_CHUNK_SIZE
+        matched_values = []
+        rowcount = 0
+        try:
+            for stmt, params, values in bulk_update_batches(self.model, objs_in, filtro, chunk_size):
+                result = db.execute(stmt, params)
+                rowcount = -1 if rowcount < 0 or result.rowcount < 0 else rowcount + result.rowcount
+                matched_values.extend(values)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        self._invalidate()
+        if not return_rows:
+            return rowcount
+
+        column = getattr(self.model, filtro)
         updated_objs = []
-        for obj_in in objs_in:
-            obj_data = jsonable_encoder(obj_in) if isinstance(
-                obj_in, BaseModel) else obj_in
-            filter_args = {filtro: obj_data[filtro]}
-            db_obj = db.query(self.model).filter_by(**filter_args).first()
-            if db_obj:
-                db.execute(
-                    update(self.model)
-                    .filter_by(**filter_args)
-                    .values(**obj_data)
-                )
-                db.commit()
-                db.refresh(db_obj)
-                updated_objs.append(db_obj)
+        for values in chunked(dict.fromkeys(matched_values), MAX_IN_PARAMS):
+            updated_objs.extend(
+                db.query(self.model).filter(column.in_(values)).populate_existing().all())
         return [updated_objs]
 
     def remove(self, db: Session, *, id: int) -> ModelType:
-        logging.info(f'Removendo objeto {self.model.__name__} de id={id}')
+        logging.info('Removendo objeto %s de id=%s', self.model.__name__, id)
         obj = db.query(self.model).get(id)
         db.delete(obj)
         db.commit()
+        self._invalidate()
         return obj
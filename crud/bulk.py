@@ -0,0 +1,86 @@
+from itertools import islice
+from typing import (Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator,
+                    List, Tuple, Type, TypeVar, Union)
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy import bindparam, update
+from sqlalchemy.sql.dml import Update
+
+from db.base_class import Base
+
+T = TypeVar('T')
+
+# O SQL Server aceita no máximo 2100 parâmetros por comando
+MAX_IN_PARAMS = 1000
+
+
+def chunked(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def achunked(iterable: Union[Iterable[T], AsyncIterable[T]], size: int) -> AsyncIterator[List[T]]:
+    """
+    Versão de `chunked` que aceita tanto iteráveis comuns quanto assíncronos.
+    """
+    if not hasattr(iterable, '__aiter__'):
+        for chunk in chunked(iterable, size):
+            yield chunk
+        return
+    chunk = []
+    async for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def as_dict(obj_in: Union[BaseModel, Dict[str, Any]]) -> Dict[str, Any]:
+    return jsonable_encoder(obj_in) if isinstance(obj_in, BaseModel) else obj_in
+
+
+def bulk_update_batches(
+    model: Type[Base],
+    objs_in: Iterable[Union[BaseModel, Dict[str, Any]]],
+    filtro: str,
+    chunk_size: int,
+) -> Iterator[Tuple[Update, List[Dict[str, Any]], List[Any]]]:
+    """
+    Agrupa os objetos pelo conjunto de colunas alteradas e gera, para cada lote,
+    um UPDATE parametrizado (executado via executemany), os parâmetros e os
+    valores de `filtro` do lote.
+
+    Os bindparams usam prefixos porque o SQLAlchemy reserva o nome da coluna
+    para o SET do próprio UPDATE.
+    """
+    table = model.__table__
+    statements: Dict[Tuple[str, ...], Update] = {}
+    for chunk in chunked(objs_in, chunk_size):
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        keys_values: Dict[Tuple[str, ...], List[Any]] = {}
+        for obj_in in chunk:
+            obj_data = as_dict(obj_in)
+            columns = tuple(sorted(key for key in obj_data if key != filtro))
+            if not columns:
+                continue
+            params = {f'v_{key}': obj_data[key] for key in columns}
+            params[f'w_{filtro}'] = obj_data[filtro]
+            groups.setdefault(columns, []).append(params)
+            keys_values.setdefault(columns, []).append(obj_data[filtro])
+
+        for columns, params in groups.items():
+            stmt = statements.get(columns)
+            if stmt is None:
+                stmt = statements[columns] = (
+                    update(table)
+                    .where(table.c[filtro] == bindparam(f'w_{filtro}'))
+                    .values({key: bindparam(f'v_{key}') for key in columns})
+                )
+            yield stmt, params, keys_values[columns]
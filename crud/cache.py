@@ -0,0 +1,119 @@
+import json
+import logging
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Sequence, Type
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from core.cache import CacheBackend, LRUTTLCache
+from core.config import settings
+from core.metrics import Counter
+from db.base_class import Base
+
+logger = logging.getLogger(__name__)
+
+crud_cache_requests_total = Counter('crud_cache_requests_total',
+                                    'Leituras do cache de CRUD', ['model', 'result'])
+
+_MISSING = object()
+
+
+class CRUDCache:
+    def __init__(self, model: Type[Base], backend: Optional[CacheBackend] = None,
+                 ttl: Optional[float] = None) -> None:
+        """
+        Cache de leitura (read-through) de um model, usado pelo CRUDBase em
+        `get`, `get_first_by_filter` e `get_multi_filter`.
+
+        Guarda só os valores das colunas; no acerto o objeto é remontado e
+        anexado à sessão de quem chamou com `merge(load=False)`, sem ir ao banco.
+        Relacionamentos não são cacheados.
+
+        As chaves incluem uma "geração" do model, trocada a cada escrita pelo
+        CRUD; as entradas antigas ficam inacessíveis e saem pelo LRU/TTL. Com o
+        backend padrão (em memória) cada processo tem o seu cache, então escritas
+        feitas por outro processo só aparecem após o TTL (CRUD_CACHE_TTL); use
+        um backend compartilhado para invalidar entre processos.
+        """
+        self.model = model
+        self.name = model.__name__
+        self.ttl = settings.CRUD_CACHE_TTL if ttl is None else ttl
+        self.backend = backend or LRUTTLCache(maxsize=settings.CRUD_CACHE_MAXSIZE, ttl=self.ttl)
+        self._columns = [attr.key for attr in inspect(model).column_attrs]
+        self._generation_key = f'crud:{self.name}:generation'
+        self.hits = 0
+        self.misses = 0
+
+    def _generation(self) -> str:
+        generation = self.backend.get(self._generation_key)
+        if generation is None:
+            generation = uuid.uuid4().hex
+            self.backend.set(self._generation_key, generation)
+        return generation
+
+    def key(self, method: str, *args: Any) -> str:
+        params = json.dumps(args, sort_keys=True, default=str)
+        return f'crud:{self.name}:{self._generation()}:{method}:{params}'
+
+    def invalidate(self) -> None:
+        # Um token novo (e não um contador) evita corrida entre processos
+        self.backend.set(self._generation_key, uuid.uuid4().hex)
+
+    def _snapshot(self, obj: Optional[Base]) -> Optional[Dict[str, Any]]:
+        if obj is None:
+            return None
+        return {column: getattr(obj, column) for column in self._columns}
+
+    def _restore(self, db: Session, data: Optional[Dict[str, Any]]) -> Optional[Base]:
+        if data is None:
+            return None
+        obj = self.model(**data)
+        make_transient_to_detached(obj)
+        return db.merge(obj, load=False)
+
+    def _lookup(self, key: str) -> Any:
+        entry = self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+            crud_cache_requests_total.inc(model=self.name, result='miss')
+            return _MISSING
+        self.hits += 1
+        crud_cache_requests_total.inc(model=self.name, result='hit')
+        # Entradas são tuplas para distinguir "sem registro" de "não cacheado"
+        return entry[0]
+
+    def fetch_one(self, db: Session, key: str, load: Callable[[], Optional[Base]]) -> Optional[Base]:
+        data = self._lookup(key)
+        if data is not _MISSING:
+            return self._restore(db, data)
+        obj = load()
+        self.backend.set(key, (self._snapshot(obj),), ttl=self.ttl)
+        return obj
+
+    def fetch_all(self, db: Session, key: str, load: Callable[[], Sequence[Base]]) -> List[Base]:
+        data = self._lookup(key)
+        if data is not _MISSING:
+            return [self._restore(db, item) for item in data]
+        objs = load()
+        self.backend.set(key, ([self._snapshot(obj) for obj in objs],), ttl=self.ttl)
+        return objs
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'model': self.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
+
+
+def cache_for(model: Type[Base]) -> Optional[CRUDCache]:
+    """
+    CRUDCache do model se ele estiver em CRUD_CACHE_MODELS (opt-in), senão None.
+    """
+    if model.__name__ not in settings.CRUD_CACHE_MODELS:
+        return None
+    logger.info('Cache de leitura habilitado para %s', model.__name__)
+    return CRUDCache(model)
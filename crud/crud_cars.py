@@ -1,4 +1,6 @@
+from crud.async_base import AsyncCRUDBase
 from crud.base import CRUDBase
+from crud.cache import cache_for
 from models.car_model import Car
 from schemas.car_schema import CarCreate, CarUpdate
 
@@ -7,4 +9,9 @@ class CRUDItem(CRUDBase[Car, CarCreate, CarUpdate]):
     pass
 
 
-car = CRUDItem(Car)
+class AsyncCRUDItem(AsyncCRUDBase[Car, CarCreate, CarUpdate]):
+    pass
+
+
+car = CRUDItem(Car, cache=cache_for(Car))
+car_async = AsyncCRUDItem(Car)
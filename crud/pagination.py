@@ -0,0 +1,93 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Tuple, Type
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, inspect, or_
+
+from db.base_class import Base
+
+
+class InvalidCursorError(ValueError):
+    """
+    Cursor de paginação malformado ou gerado para outra ordenação.
+    """
+
+
+class InvalidOrderByError(ValueError):
+    """
+    Coluna que não pode ser usada na paginação por cursor.
+    """
+
+
+def keyset_column(model: Type[Base], order_by: str) -> Any:
+    """
+    Coluna de ordenação da paginação por cursor. Só colunas NOT NULL são
+    aceitas: `col > NULL` não é comparável e registros com NULL seriam pulados
+    (e o SQL Server não tem NULLS FIRST/LAST para uma ordem portável).
+    """
+    column = inspect(model).columns.get(order_by)
+    if column is None:
+        raise InvalidOrderByError(f'Campo desconhecido em {model.__name__}: {order_by}')
+    if column.nullable:
+        raise InvalidOrderByError(
+            f'order_by={order_by} aceita NULL e não pode ser usado na paginação por cursor')
+    return getattr(model, order_by)
+
+
+def encode_cursor(order_by: str, values: Tuple[Any, Any]) -> str:
+    """
+    Gera um cursor opaco com a coluna de ordenação e os valores (ordem, id) do último registro.
+    """
+    payload = json.dumps([order_by, jsonable_encoder(list(values))],
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, order_by: str) -> Tuple[Any, Any]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_order_by, values = json.loads(
+            base64.urlsafe_b64decode(padded.encode('ascii')))
+        order_value, last_id = values
+    except (ValueError, TypeError, binascii.Error) as exc:
+        raise InvalidCursorError(f'Cursor inválido: {cursor!r}') from exc
+    if cursor_order_by != order_by:
+        raise InvalidCursorError(
+            f'Cursor gerado para order_by={cursor_order_by}, não {order_by}')
+    return order_value, last_id
+
+
+def cursor_for(obj: Any, order_by: str) -> str:
+    """
+    Cursor que aponta para a página seguinte a `obj` (objeto ORM ou mapeamento).
+    """
+    if hasattr(obj, 'keys'):
+        return encode_cursor(order_by, (obj[order_by], obj['id']))
+    return encode_cursor(order_by, (getattr(obj, order_by), obj.id))
+
+
+def keyset_order(model: Type[Base], order_by: str) -> List[Any]:
+    column = keyset_column(model, order_by)
+    if order_by == 'id':
+        return [column]
+    # O id desempata registros com o mesmo valor na coluna de ordenação
+    return [column, model.id]
+
+
+def keyset_clause(model: Type[Base], order_by: str, after: Optional[str]) -> List[Any]:
+    """
+    Cláusulas WHERE que posicionam a consulta logo após o cursor `after`.
+
+    Usa a forma expandida `(col > v) OR (col = v AND id > last_id)` em vez de
+    comparação de tuplas, que o SQL Server não suporta.
+    """
+    column = keyset_column(model, order_by)
+    if not after:
+        return []
+    order_value, last_id = decode_cursor(after, order_by)
+    if order_by == 'id':
+        return [model.id > last_id]
+    return [or_(column > order_value,
+                and_(column == order_value, model.id > last_id))]
@@ -0,0 +1,181 @@
+import logging
+import operator
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Type, Union
+
+from sqlalchemy import bindparam, desc, inspect, select
+from sqlalchemy.sql import Select
+
+from crud.bulk import MAX_IN_PARAMS
+from db.base_class import Base
+
+logger = logging.getLogger(__name__)
+
+# Operadores de `get_multi_filters`: (coluna, parâmetro) -> cláusula
+OPERATOR_MAP: Dict[str, Callable[[Any, Any], Any]] = {
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    'like': lambda field, value: field.like(value),
+    'ilike': lambda field, value: field.ilike(value),
+    'in': lambda field, value: field.in_(value),
+    'notin': lambda field, value: field.notin_(value),
+    # Adicionar mais operadores conforme necessário
+}
+
+# Operadores de `get_last_by_filters`, que usa '==', 'like' por trecho e 'is_null'
+LAST_OPERATOR_MAP: Dict[str, Callable[[Any, Any], Any]] = {
+    '>': operator.gt,
+    '<': operator.lt,
+    '>=': operator.ge,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+    'like': lambda field, value: field.like(value),
+    'is_null': lambda field, value: field.is_(None),
+}
+
+_OPERATORS = {'multi': OPERATOR_MAP, 'last': LAST_OPERATOR_MAP}
+_EXPANDING = frozenset({'in', 'notin'})
+_NO_VALUE = frozenset({'is_null'})
+# Comparações que com valor None viram IS NULL / IS NOT NULL (e não "= NULL")
+_NULL_COMPARISONS = {'=': 'is_', '==': 'is_', '!=': 'is_not'}
+
+FilterSpec = Tuple[Tuple[str, str, bool], ...]
+
+
+def _pad_in_values(values: Sequence[Any]) -> List[Any]:
+    """
+    Completa a lista do IN até a próxima potência de 2 repetindo o último valor
+    (sem mudar o resultado), para que listas de tamanhos próximos gerem o mesmo
+    SQL e reaproveitem o plano preparado no servidor.
+    """
+    values = list(values)
+    if not values:
+        return values
+    size = 1 << (len(values) - 1).bit_length()
+    if size > MAX_IN_PARAMS:
+        return values
+    return values + [values[-1]] * (size - len(values))
+
+
+def _contains(value: Any) -> str:
+    return f'%{value}%'
+
+
+@dataclass(frozen=True)
+class CompiledFilters:
+    statement: Select
+    # (nome do bindparam, transformação do valor) na ordem dos filtros; None
+    # para filtros sem valor ou ignorados
+    binds: Tuple[Optional[Tuple[str, Optional[Callable[[Any], Any]]]], ...]
+
+    def params(self, values: Sequence[Any]) -> Dict[str, Any]:
+        params = {}
+        for bind, value in zip(self.binds, values):
+            if bind is None:
+                continue
+            name, transform = bind
+            params[name] = transform(value) if transform is not None else value
+        return params
+
+
+@lru_cache(maxsize=512)
+def compile_filters(model: Type[Base], spec: FilterSpec, operators: str = 'multi',
+                    order_by: Optional[str] = None, descending: bool = False) -> CompiledFilters:
+    """
+    Monta (uma vez por formato de filtro) o SELECT parametrizado com
+    `bindparam`, validando campos e operadores contra o model.
+
+    `spec` é a sequência de (campo, operador, valor é None); os valores vão
+    depois em `CompiledFilters.params(valores)`. Comparações de igualdade com
+    None geram IS NULL / IS NOT NULL, sem parâmetro. Como o texto do SQL só
+    depende do formato, o cache de compilação do SQLAlchemy e os planos
+    preparados no servidor são reaproveitados entre chamadas.
+    """
+    operator_map = _OPERATORS[operators]
+    columns = inspect(model).columns
+    clauses = []
+    binds: List[Optional[Tuple[str, Optional[Callable[[Any], Any]]]]] = []
+    for i, (field_name, op, is_none) in enumerate(spec):
+        if field_name not in columns:
+            raise ValueError(f"Campo desconhecido em {model.__name__}: {field_name}")
+        if op not in operator_map:
+            if operators == 'last':
+                # Mantém o comportamento de `get_last_by_filters`: ignora o filtro
+                logger.warning('Operador desconhecido ignorado: %s', op)
+                binds.append(None)
+                continue
+            raise ValueError(f"Operador desconhecido: {op}")
+        field = getattr(model, field_name)
+        name = f'f{i}_{field_name}'
+        if op in _NO_VALUE:
+            clauses.append(operator_map[op](field, None))
+            binds.append(None)
+        elif is_none and op in _NULL_COMPARISONS:
+            clauses.append(getattr(field, _NULL_COMPARISONS[op])(None))
+            binds.append(None)
+        elif op in _EXPANDING:
+            clauses.append(operator_map[op](field, bindparam(name, expanding=True)))
+            binds.append((name, _pad_in_values))
+        else:
+            clauses.append(operator_map[op](field, bindparam(name)))
+            binds.append((name, _contains if operators == 'last' and op == 'like' else None))
+
+    statement = select(model).where(*clauses)
+    if order_by is not None:
+        column = getattr(model, order_by)
+        statement = statement.order_by(desc(column) if descending else column)
+    return CompiledFilters(statement, tuple(binds))
+
+
+def multi_filters_query(model: Type[Base], filters: List[Dict[str, Any]], *,
+                        order_by: Optional[str] = None, skip: int = 0,
+                        limit: Optional[int] = None) -> Tuple[Select, Dict[str, Any]]:
+    """
+    Statement e parâmetros para a lista de filtros de `get_multi_filters`.
+    """
+    if order_by is None and (skip or limit is not None):
+        # OFFSET/FETCH no SQL Server exige ORDER BY
+        order_by = 'id'
+    spec = tuple((item["field"], item.get("operator", "="), item["value"] is None) for item in filters)
+    compiled = compile_filters(model, spec, 'multi', order_by)
+    statement = compiled.statement
+    if skip:
+        statement = statement.offset(skip)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement, compiled.params([item["value"] for item in filters])
+
+
+def last_filters_query(
+    model: Type[Base], filters: Dict[str, Dict[str, Union[str, int]]]
+) -> Tuple[Select, Dict[str, Any]]:
+    """
+    Statement e parâmetros para o dicionário de filtros de `get_last_by_filters`,
+    já ordenado pelo id decrescente.
+    """
+    spec = tuple((name, data['operator'], data.get('value') is None) for name, data in filters.items())
+    compiled = compile_filters(model, spec, 'last', 'id', descending=True)
+    return compiled.statement, compiled.params([data.get('value') for data in filters.values()])
+
+
+@lru_cache(maxsize=256)
+def _projection(model: Type[Base], fields: Tuple[str, ...]) -> Tuple[Any, ...]:
+    columns = inspect(model).columns
+    unknown = [field for field in fields if field not in columns]
+    if unknown:
+        raise ValueError(f"Campos desconhecidos em {model.__name__}: {', '.join(unknown)}")
+    return tuple(getattr(model, field) for field in fields)
+
+
+def projection(model: Type[Base], fields: Iterable[str], required: Iterable[str] = ()) -> Tuple[Any, ...]:
+    """
+    Colunas para um SELECT só com `fields` (validados contra o model), mais as
+    `required` que ainda não estiverem na lista (ex.: as usadas no cursor).
+    """
+    return _projection(model, tuple(dict.fromkeys([*fields, *required])))
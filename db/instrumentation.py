@@ -0,0 +1,83 @@
+import logging
+import time
+from typing import Any, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.config import settings
+from core.metrics import Counter, Histogram
+from core.timing import current, record
+
+logger = logging.getLogger(__name__)
+
+queries_total = Counter('db_queries_total', 'Statements SQL executados', ['engine'])
+query_duration = Histogram('db_query_duration_seconds', 'Duração dos statements SQL', ['engine'])
+slow_queries_total = Counter('db_slow_queries_total',
+                             'Statements acima de DB_SLOW_QUERY_SECONDS', ['engine'])
+n_plus_one_total = Counter('db_n_plus_one_total',
+                           'Requests que repetiram o mesmo statement DB_N_PLUS_ONE_THRESHOLD vezes',
+                           ['engine'])
+
+_MAX_STATEMENT_CHARS = 500
+
+
+def _shape(value: Any) -> str:
+    if isinstance(value, dict):
+        return '{%s}' % ', '.join(f'{key}: {type(item).__name__}' for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        if value and isinstance(value[0], (dict, list, tuple)):
+            # executemany: descreve o primeiro item e a quantidade
+            return f'{len(value)} x {_shape(value[0])}'
+        return '(%s)' % ', '.join(type(item).__name__ for item in value)
+    return type(value).__name__
+
+
+def _short(statement: str) -> str:
+    statement = ' '.join(statement.split())
+    if len(statement) > _MAX_STATEMENT_CHARS:
+        return statement[:_MAX_STATEMENT_CHARS] + '...'
+    return statement
+
+
+def instrument_engine(engine: Union[Engine, AsyncEngine], name: str) -> None:
+    """
+    Registra eventos na engine para medir cada statement: métricas por engine,
+    tempo 'sql' e contagem de queries da request atual (core.timing), log dos
+    statements lentos com o formato dos parâmetros (tipos, não valores) e aviso
+    quando a mesma request repete o mesmo statement muitas vezes (N+1).
+
+    Engines assíncronas são instrumentadas pela `sync_engine`.
+    """
+    sync_engine = getattr(engine, 'sync_engine', engine)
+
+    @event.listens_for(sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._instrumentation_start = time.perf_counter()
+
+    @event.listens_for(sync_engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_instrumentation_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        queries_total.inc(engine=name)
+        query_duration.observe(elapsed, engine=name)
+
+        if elapsed >= settings.DB_SLOW_QUERY_SECONDS:
+            slow_queries_total.inc(engine=name)
+            logger.warning('Query lenta em %s (%.3fs): %s | parametros: %s',
+                           name, elapsed, _short(statement), _shape(parameters))
+
+        stats = current()
+        if stats is None:
+            return
+        record('sql', elapsed)
+        count = stats.count_statement(statement)
+        # Avisa uma vez por statement, ao atingir o limite
+        if count == settings.DB_N_PLUS_ONE_THRESHOLD:
+            n_plus_one_total.inc(engine=name)
+            logger.warning('Possível N+1 em %s %s: statement executado %s vezes em %s: %s',
+                           stats.method, stats.path, count, name, _short(statement))
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Tuple, Union
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from core.metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# nome da engine -> (engine, configuração do pool)
+_engines: Dict[str, Tuple[Union[Engine, AsyncEngine], Any]] = {}
+
+
+def _pool_values(read) -> Dict[Tuple[str, ...], float]:
+    values = {}
+    for name, (engine, _) in _engines.items():
+        pool = getattr(engine, 'sync_engine', engine).pool
+        if hasattr(pool, 'checkedout'):
+            values[(name,)] = read(pool)
+    return values
+
+
+pool_checked_out = Gauge('db_pool_checked_out', 'Conexões em uso', ['engine'],
+                         callback=lambda: _pool_values(lambda pool: pool.checkedout()))
+pool_checked_in = Gauge('db_pool_checked_in', 'Conexões ociosas no pool', ['engine'],
+                        callback=lambda: _pool_values(lambda pool: pool.checkedin()))
+pool_overflow = Gauge('db_pool_overflow', 'Conexões além de pool_size (negativo = vagas no pool)',
+                      ['engine'], callback=lambda: _pool_values(lambda pool: pool.overflow()))
+pool_size = Gauge('db_pool_size', 'Tamanho configurado do pool', ['engine'],
+                  callback=lambda: _pool_values(lambda pool: pool.size()))
+pool_wait_seconds = Histogram('db_pool_wait_seconds',
+                              'Tempo para obter uma conexão do pool (inclui abrir uma nova)',
+                              ['engine'], buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30))
+pool_timeouts_total = Counter('db_pool_timeouts_total',
+                              'Checkouts que estouraram o pool_timeout', ['engine'])
+pool_health_failures_total = Counter('db_pool_health_failures_total',
+                                     'Falhas no health check periódico', ['engine'])
+
+
+class _WaitTimeMixin:
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_timeouts_total.inc(engine=self.logging_name)
+            raise
+        finally:
+            pool_wait_seconds.observe(time.perf_counter() - start, engine=self.logging_name)
+
+
+class InstrumentedQueuePool(_WaitTimeMixin, QueuePool):
+    """
+    QueuePool que mede o tempo de espera por conexão (label = pool_logging_name).
+    """
+
+
+class InstrumentedAsyncQueuePool(_WaitTimeMixin, AsyncAdaptedQueuePool):
+    """
+    Versão para engines assíncronas (asyncpg).
+    """
+
+
+def engine_kwargs(name: str, config: Any, is_async: bool = False) -> Dict[str, Any]:
+    """
+    Argumentos de `create_engine`/`create_async_engine` para a `PoolConfig` da engine.
+    """
+    return {
+        'poolclass': InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        'pool_logging_name': name,
+        'pool_size': config.size,
+        'max_overflow': config.max_overflow,
+        'pool_recycle': config.recycle,
+        'pool_timeout': config.timeout,
+        'pool_pre_ping': config.pre_ping,
+    }
+
+
+def register_engine(name: str, engine: Union[Engine, AsyncEngine], config: Any) -> None:
+    """
+    Inclui a engine nas métricas de pool, no warm-up e no health check.
+    """
+    _engines[name] = (engine, config)
+
+
+def _check_sync(engine: Engine) -> None:
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+
+
+def _warm_up_sync(engine: Engine, count: int) -> None:
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(engine.connect())
+    finally:
+        # Devolve todas ao pool, que fica com elas abertas
+        for conn in connections:
+            conn.close()
+
+
+async def _warm_up_async(engine: AsyncEngine, count: int) -> None:
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(await engine.connect())
+    finally:
+        for conn in connections:
+            await conn.close()
+
+
+async def warm_up(run_sync) -> None:
+    """
+    Abre `warmup` conexões de cada engine na subida. `run_sync` executa as
+    chamadas bloqueantes das engines síncronas (ex.: `db_executor.run`).
+    Falhas são só logadas: a aplicação sobe e as conexões abrem sob demanda.
+    """
+    for name, (engine, config) in _engines.items():
+        count = min(config.warmup, config.size)
+        if count <= 0:
+            continue
+        start = time.perf_counter()
+        try:
+            if isinstance(engine, AsyncEngine):
+                await _warm_up_async(engine, count)
+            else:
+                await run_sync(_warm_up_sync, engine, count)
+        except Exception as exc:
+            logger.warning('Falha no warm-up do pool %s: %r', name, exc)
+            continue
+        logger.info('Pool %s aquecido com %s conexões em %.2fs',
+                    name, count, time.perf_counter() - start)
+
+
+async def _health_check(name: str, engine: Union[Engine, AsyncEngine], run_sync) -> None:
+    try:
+        if isinstance(engine, AsyncEngine):
+            async with engine.connect() as conn:
+                await conn.execute(text('SELECT 1'))
+        else:
+            await run_sync(_check_sync, engine)
+    except Exception as exc:
+        pool_health_failures_total.inc(engine=name)
+        logger.warning('Health check do pool %s falhou (%r); descartando conexões', name, exc)
+        # As próximas requisições abrem conexões novas em vez de pegar mortas
+        if isinstance(engine, AsyncEngine):
+            await engine.dispose()
+        else:
+            await run_sync(engine.dispose)
+
+
+async def health_check_loop(run_sync) -> None:
+    """
+    Testa periodicamente as engines com `health_check_interval`, como
+    alternativa ao `pre_ping` (que custa um round trip em todo checkout).
+    Roda até ser cancelada.
+    """
+    checks: List[Tuple[str, Union[Engine, AsyncEngine], float]] = [
+        (name, engine, config.health_check_interval)
+        for name, (engine, config) in _engines.items() if config.health_check_interval]
+    if not checks:
+        return
+    next_run = {name: time.monotonic() + interval for name, _, interval in checks}
+    while True:
+        now = time.monotonic()
+        for name, engine, interval in checks:
+            if now >= next_run[name]:
+                try:
+                    await _health_check(name, engine, run_sync)
+                except Exception as exc:
+                    # Ex.: executor cheio ao descartar o pool; tenta no próximo ciclo
+                    logger.warning('Erro no health check do pool %s: %r', name, exc)
+                next_run[name] = time.monotonic() + interval
+        await asyncio.sleep(max(0.0, min(next_run.values()) - time.monotonic()))
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    stats = {}
+    for name, (engine, config) in _engines.items():
+        pool: Pool = getattr(engine, 'sync_engine', engine).pool
+        stats[name] = {
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'max_overflow': config.max_overflow,
+            'pre_ping': config.pre_ping,
+            'health_check_interval': config.health_check_interval,
+        }
+    return stats
@@ -2,17 +2,20 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
 from core.config import settings
+from db.instrumentation import instrument_engine
+from db.pool import engine_kwargs, register_engine
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 
 
 # Criando um engine assíncrono com asyncpg
 engine_psql = create_async_engine(
     str(settings.SQLALCHEMY_DATABASE_URI_PG),
-    pool_pre_ping=True,
-    future=True  # Habilita a API 2.0 do SQLAlchemy
+    future=True,  # Habilita a API 2.0 do SQLAlchemy
+    **engine_kwargs('psql', settings.DB_POOL_PSQL, is_async=True)
 )
+register_engine('psql', engine_psql, settings.DB_POOL_PSQL)
 
-# SQLAlchemyInstrumentor().instrument(engine=engine_psql)
+instrument_engine(engine_psql, 'psql')
 
 # Criando a fábrica de sessões assíncronas
 SessionLocal_psql = sessionmaker(
@@ -23,18 +26,26 @@ SessionLocal_psql = sessionmaker(
 
 
 engine_212 = create_engine(
-    str(settings.SQLALCHEMY_DATABASE_URI_212), pool_pre_ping=True)
-SQLAlchemyInstrumentor().instrument(
-    engine=engine_212
-)
+    str(settings.SQLALCHEMY_DATABASE_URI_212),
+    fast_executemany=settings.MSSQL_FAST_EXECUTEMANY,
+    **engine_kwargs('212', settings.DB_POOL_212))
+register_engine('212', engine_212, settings.DB_POOL_212)
+instrument_engine(engine_212, '212')
 SessionLocal_212 = sessionmaker(
     autocommit=False, autoflush=False, bind=engine_212)
 
 
 engine_211 = create_engine(
-    str(settings.SQLALCHEMY_DATABASE_URI_211), pool_pre_ping=True)
-SQLAlchemyInstrumentor().instrument(
-    engine=engine_211
-)
+    str(settings.SQLALCHEMY_DATABASE_URI_211),
+    fast_executemany=settings.MSSQL_FAST_EXECUTEMANY,
+    **engine_kwargs('211', settings.DB_POOL_211))
+register_engine('211', engine_211, settings.DB_POOL_211)
+instrument_engine(engine_211, '211')
 SessionLocal_211 = sessionmaker(
     autocommit=False, autoflush=False, bind=engine_211)
+
+# O instrumentor é um singleton: só a primeira chamada a instrument() tem
+# efeito, então todas as engines vão juntas (a assíncrona pela sync_engine)
+SQLAlchemyInstrumentor().instrument(
+    engines=[engine_psql.sync_engine, engine_212, engine_211]
+)
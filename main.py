@@ -1,22 +1,63 @@
-from fastapi import FastAPI
+import asyncio
+import hashlib
+import json
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Tuple
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from starlette.middleware.cors import CORSMiddleware
 import logging
+import logging.config
 import uvicorn
 from api.api_v1.api import api_router
+from api.deps import db_executor
 from core.config import settings
+from core.http_clients import http_clients
+from core.metrics import CONTENT_TYPE_LATEST, render_latest
+from core.serialization import FastJSONResponse, orjson
+from core.timing import ServerTimingMiddleware
+from core.xml_render import precompile_templates, xml_executor
+from db.pool import health_check_loop, pool_stats, warm_up
 from opentelemetry.instrumentation.logging import LoggingInstrumentor
 from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
 from fastapi.openapi.docs import get_swagger_ui_html, get_redoc_html
 from fastapi.openapi.utils import get_openapi
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    http_clients.start()
+    if settings.TEMPLATES_PRECOMPILE:
+        precompile_templates()
+    # Gera o schema e as páginas de documentação antes da primeira request
+    warm_docs()
+    await warm_up(db_executor.run)
+    health_check = asyncio.ensure_future(health_check_loop(db_executor.run))
+    yield
+    health_check.cancel()
+    await asyncio.gather(health_check, return_exceptions=True)
+    await http_clients.aclose()
+    db_executor.shutdown(wait=False)
+    if xml_executor is not None:
+        xml_executor.shutdown(wait=False)
+
+
 def api_factory():
     app = FastAPI(title=settings.PROJECT_NAME,
                   root_path="/Template",
                   version='0.0.1',
                   description='Template para criação de APIs',
+                  lifespan=lifespan,
+                  # Servidas pelas rotas com cache (ETag/304) definidas abaixo
+                  openapi_url=None,
+                  docs_url=None,
+                  redoc_url=None,
+                  default_response_class=FastJSONResponse if settings.FAST_JSON_RESPONSE else JSONResponse,
                   )
     logging.config.dictConfig(settings.LOGGING_CONFIG)
+    if settings.FAST_JSON_RESPONSE and orjson is None:
+        logging.warning('FAST_JSON_RESPONSE ligado, mas o orjson não está instalado: '
+                        'usando o json da stdlib, sem o ganho de desempenho')
     LoggingInstrumentor().instrument()
     HTTPXClientInstrumentor().instrument()
 
@@ -31,6 +72,8 @@ def api_factory():
             allow_headers=["*"],
         )
 
+    app.add_middleware(ServerTimingMiddleware)
+
     app.include_router(api_router, prefix=settings.API_V1_STR)
 
     return app
@@ -45,23 +88,76 @@ def get_index():
     return {'msg': 'API está no ar!'}
 
 
-@app.get(f"{app.root_path}/docs", include_in_schema=False)
-async def custom_swagger_ui_html():
-    return get_swagger_ui_html(openapi_url="/Template/openapi.json", title='API Docs')
+@app.get(f"{app.root_path}/metrics", include_in_schema=False)
+def get_metrics():
+    return Response(render_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get(f"{app.root_path}/pool-stats", include_in_schema=False)
+def get_pool_stats():
+    return pool_stats()
+
+
+'''Documentação: as rotas não mudam com a API no ar, então o schema e as
+páginas são gerados uma vez e servidos como bytes, com ETag e 304'''
+_docs: Dict[str, Tuple[bytes, str]] = {}
+
+
+def _build_openapi() -> bytes:
+    app.openapi_schema = get_openapi(title=app.title, version="0.0.1",
+                                     routes=app.routes, description=app.description)
+    return json.dumps(app.openapi_schema, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+_DOCS_BUILDERS: Dict[str, Callable[[], bytes]] = {
+    "openapi": _build_openapi,
+    "docs": lambda: get_swagger_ui_html(openapi_url="/Template/openapi.json", title='API Docs').body,
+    "redoc": lambda: get_redoc_html(openapi_url="/Template/openapi.json", title='ReDoc').body,
+}
+
+
+def _cached_doc(name: str) -> Tuple[bytes, str]:
+    doc = _docs.get(name)
+    if doc is None:
+        body = _DOCS_BUILDERS[name]()
+        doc = _docs[name] = (body, '"%s"' % hashlib.sha256(body).hexdigest()[:32])
+    return doc
+
+
+def warm_docs() -> None:
+    for name in _DOCS_BUILDERS:
+        _cached_doc(name)
+
+
+def _doc_response(request: Request, name: str, media_type: str) -> Response:
+    body, etag = _cached_doc(name)
+    # no-cache: o cliente pode guardar, mas revalida a cada uso (barato com o 304)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in (
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type=media_type, headers=headers)
+
+
+@app.get("/docs", include_in_schema=False)
+async def custom_swagger_ui_html(request: Request):
+    return _doc_response(request, "docs", "text/html")
 
 # Rota para a documentação Redoc
 
 
-@app.get(f"{app.root_path}/redoc", include_in_schema=False)
-async def redoc_html():
-    return get_redoc_html(openapi_url="/Template/openapi.json", title='ReDoc')
+@app.get("/redoc", include_in_schema=False)
+async def redoc_html(request: Request):
+    return _doc_response(request, "redoc", "text/html")
 
 '''Rota para o esquema OpenAPI'''
 
 
-@app.get(f"{app.root_path}/openapi.json", include_in_schema=False)
-async def get_custom_openapi():
-    return get_openapi(title=app.title, version="0.0.1", routes=app.routes, description=app.description)
+@app.get("/openapi.json", include_in_schema=False)
+async def get_custom_openapi(request: Request):
+    return _doc_response(request, "openapi", "application/json")
 
 
 def run():
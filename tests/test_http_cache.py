@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import httpx
+
+import core.request as request_module
+from core.cache import LRUTTLCache
+from core.http_cache import ResponseCache
+from core.request import RequestClient
+
+URL = 'https://api.exemplo.com/carros'
+
+
+def test_revalidacao_com_304_serve_corpo_do_cache(monkeypatch):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if request.headers.get('if-none-match') == '"v1"':
+            return httpx.Response(304, headers={'ETag': '"v1"', 'Cache-Control': 'max-age=60'})
+        # Já nasce expirada, mas fica guardada para revalidar com o ETag
+        return httpx.Response(200, json={'carros': ['Gol']},
+                              headers={'ETag': '"v1"', 'Cache-Control': 'max-age=0'})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    cache = ResponseCache(LRUTTLCache(maxsize=16))
+    monkeypatch.setattr(request_module.http_clients, 'get', lambda url: client)
+    monkeypatch.setattr(request_module, 'response_cache', cache)
+
+    def get():
+        return RequestClient('get', URL, headers={}, cache=True).send_api_request()
+
+    async def run():
+        try:
+            first = await get()
+            second = await get()
+            third = await get()
+        finally:
+            await client.aclose()
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+
+    assert first == second == third == {'carros': ['Gol']}
+    # 200, depois 304 (revalidação); a terceira é servida do cache sem upstream
+    assert len(calls) == 2
+    assert 'if-none-match' not in calls[0].headers
+    assert calls[1].headers['if-none-match'] == '"v1"'
+    entry = cache.backend.get(cache.key('get', URL, None))
+    assert entry.is_fresh
+    assert entry.fresh_until > time.time() + 50
+
+
+def test_alterar_o_resultado_nao_afeta_o_cache(monkeypatch):
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={'carros': ['Gol']}, headers={'Cache-Control': 'max-age=60'})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(request_module.http_clients, 'get', lambda url: client)
+    monkeypatch.setattr(request_module, 'response_cache', ResponseCache(LRUTTLCache(maxsize=16)))
+
+    def get():
+        return RequestClient('get', URL, headers={}, cache=True).send_api_request()
+
+    async def run():
+        try:
+            # As duas primeiras compartilham a mesma chamada ao upstream
+            first, coalesced = await asyncio.gather(get(), get())
+            first['carros'].append('Onix')
+            coalesced['carros'].clear()
+            hit = await get()
+        finally:
+            await client.aclose()
+        return first, coalesced, hit
+
+    first, coalesced, hit = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert first is not coalesced
+    assert hit == {'carros': ['Gol']}
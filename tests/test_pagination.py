@@ -0,0 +1,22 @@
+import pytest
+
+from crud.pagination import InvalidOrderByError, encode_cursor, keyset_clause, keyset_order
+from models.car_model import Car
+
+
+@pytest.mark.parametrize('order_by', ['model', 'year'])
+def test_coluna_que_aceita_null_e_rejeitada(order_by):
+    with pytest.raises(InvalidOrderByError):
+        keyset_order(Car, order_by)
+    with pytest.raises(InvalidOrderByError):
+        keyset_clause(Car, order_by, encode_cursor(order_by, (None, 10)))
+
+
+def test_coluna_desconhecida_e_rejeitada():
+    with pytest.raises(InvalidOrderByError):
+        keyset_clause(Car, 'cor', None)
+
+
+def test_id_continua_aceito():
+    clause, = keyset_clause(Car, 'id', encode_cursor('id', (10, 10)))
+    assert '"TB_Car".id > :id_1' in str(clause)
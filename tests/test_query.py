@@ -0,0 +1,38 @@
+from crud.query import compile_filters, last_filters_query, multi_filters_query
+from models.car_model import Car
+
+
+def test_igualdade_com_none_gera_is_null_sem_parametro():
+    statement, params = multi_filters_query(Car, [
+        {'field': 'model', 'operator': '=', 'value': None},
+        {'field': 'year', 'operator': '!=', 'value': None},
+    ])
+    sql = str(statement)
+
+    assert '"TB_Car".model IS NULL' in sql
+    assert '"TB_Car".year IS NOT NULL' in sql
+    assert ':f0_model' not in sql and ':f1_year' not in sql
+    assert params == {}
+
+
+def test_last_filters_com_none_gera_is_null_sem_parametro():
+    statement, params = last_filters_query(Car, {
+        'model': {'operator': '==', 'value': None},
+        'year': {'operator': '!=', 'value': None},
+    })
+    sql = str(statement)
+
+    assert '"TB_Car".model IS NULL' in sql
+    assert '"TB_Car".year IS NOT NULL' in sql
+    assert params == {}
+
+
+def test_none_faz_parte_da_chave_do_formato():
+    with_value = compile_filters(Car, (('model', '=', False),))
+    with_none = compile_filters(Car, (('model', '=', True),))
+
+    assert with_value is not with_none
+    assert '"TB_Car".model = :f0_model' in str(with_value.statement)
+    assert with_value.params(['Gol']) == {'f0_model': 'Gol'}
+    assert 'IS NULL' in str(with_none.statement)
+    assert with_none.params([None]) == {}
@@ -0,0 +1,93 @@
+import asyncio
+
+from lxml import etree
+
+import core.xml_render as xml_render
+from core.xml_render import XmlRender, _BlankTextStripper, get_environment, prepare_payload
+
+TEMPLATE = '''<?xml version="1.0"?>
+<!-- comentário com > e < -->
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/">
+  <soapenv:Header>
+    <Token valor="{{ headers.token }}" regra="a >  b" espacos="  x   y  " vazio=""/>
+  </soapenv:Header>
+  <soapenv:Body>
+    {% for item in items %}
+    <Item id="{{ item.id }}">
+      <Nome>{{ item.nome }}</Nome>
+      <Brancos>   </Brancos>
+      <Vazio></Vazio>
+      <Entidades>&#233; &amp; &lt; &gt; &quot;</Entidades>
+      <Dados><![CDATA[<b>   </b> & <i>x</i>]]></Dados>
+    </Item>
+    {% endfor %}
+  </soapenv:Body>
+</soapenv:Envelope>
+'''
+
+
+def _headers():
+    return {'token': 'abc & <def>'}
+
+
+def _items():
+    # Novos a cada chamada para os testes não dependerem da ordem de execução
+    return [{'id': 1, 'nome': 'Gol   1.0'}, {'id': 2, 'nome': 'Onix & Cia'}]
+
+
+def _canonical(xml):
+    return etree.canonicalize(xml_data=xml)
+
+
+def _render_both(monkeypatch, tmp_path):
+    (tmp_path / 'teste.xml').write_text(TEMPLATE, encoding='utf-8')
+    monkeypatch.setattr(xml_render, 'TEMPLATES_PATH', str(tmp_path))
+
+    async def run():
+        rendered = await XmlRender._render_mult('teste', _headers(), _items())
+        streamed = b''.join([chunk async for chunk in
+                             XmlRender.stream_render_mult('teste', _headers(), _items())])
+        return rendered, streamed.decode('utf-8')
+
+    return asyncio.run(run())
+
+
+def test_render_nao_altera_o_payload_de_quem_chama(monkeypatch, tmp_path):
+    (tmp_path / 'teste.xml').write_text(TEMPLATE, encoding='utf-8')
+    monkeypatch.setattr(xml_render, 'TEMPLATES_PATH', str(tmp_path))
+    headers, items = _headers(), _items()
+
+    async def run():
+        return [await XmlRender._render_mult('teste', headers, items) for _ in range(2)]
+
+    first, second = asyncio.run(run())
+
+    assert first == second
+    assert '&amp;amp;' not in second
+    assert headers == _headers() and items == _items()
+
+
+def test_stream_gera_o_mesmo_documento_que_render(monkeypatch, tmp_path):
+    rendered, streamed = _render_both(monkeypatch, tmp_path)
+
+    assert _canonical(streamed) == _canonical(rendered)
+    # Atributos e CDATA passam intactos, espaços entre tags somem
+    assert 'regra="a >  b"' in streamed
+    assert 'espacos="  x   y  "' in streamed
+    assert '<![CDATA[<b>   </b> & <i>x</i>]]>' in streamed
+    assert '<!--' not in streamed and '<?xml' not in streamed
+    assert '>\n' not in streamed
+
+
+def test_stripper_independe_da_divisao_dos_pedacos(monkeypatch, tmp_path):
+    rendered, _ = _render_both(monkeypatch, tmp_path)
+    payload = prepare_payload(dict(headers=_headers(), items=_items()))
+    xml = get_environment(str(tmp_path)).get_template('teste.xml').render(**payload)
+
+    whole = _BlankTextStripper()
+    expected = whole.feed(xml) + whole.close()
+    by_char = _BlankTextStripper()
+    result = ''.join(by_char.feed(char) for char in xml) + by_char.close()
+
+    assert result == expected
+    assert _canonical(result) == _canonical(rendered)